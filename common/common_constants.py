@@ -1,5 +1,30 @@
+import os
+import tempfile
+
+# Container-level scratch directory for state shared by warm invocations (caches, outbox, workspaces).
+# Resolved once at import time, before a request points TMPDIR at its own workspace; every such
+# directory is built from it and can be overridden by its own CAUSALBENCH_*_DIR variable.
+CONTAINER_TMP_DIR = os.environ.get("CAUSALBENCH_TMP_DIR", tempfile.gettempdir())
+
 CAUSAL_ANALYSIS_FAILED = "Causal analysis failed. Please try again later."
 EMAIL = "admin@causalbench.org"
 REPLY_TO_ADDRESS = "contact@causalbench.org"
 EMAIL_PASSWORD = ""
 RANDOM_SEED = 42
+DOWNLOAD_MAX_WORKERS = 8
+ZIP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+CAUSAL_ESTIMATOR = "linear"
+G2S_SAMPLING_MODE = "batched"
+EMAIL_ZIP_THRESHOLD_BYTES = 1024 * 1024
+EMAIL_ATTACHMENT_MAX_BYTES = 18 * 1024 * 1024  # base64 grows attachments by a third, Gmail accepts 25 MB messages
+EMAIL_STREAM_CHUNK_BYTES = 57 * 1024  # multiple of 57, so every chunk encodes to whole 76-character base64 lines
+MAIL_TRANSPORT = "smtp"
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_TIMEOUT_SECONDS = 30  # socket timeout, so a connection left half-open by a frozen container cannot block a send
+DELIVERY_MAX_ATTEMPTS = 5
+DELIVERY_RETRY_BASE_SECONDS = 30
+DELIVERY_WAIT_SECONDS = 0  # longest the handler waits for the report email, 0 returns the queued ticket
+DELIVERY_WAIT_MARGIN_SECONDS = 5  # invocation time kept back for cleanup after waiting
+DELIVERY_SENT_RETENTION_SECONDS = 24 * 60 * 60  # how long ticket_status can still report a sent ticket
+WORKSPACE_STALE_SECONDS = 15 * 60  # the Lambda timeout limit, no live request is older
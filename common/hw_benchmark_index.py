@@ -0,0 +1,164 @@
+import csv
+import hashlib
+import os
+
+import numpy as np
+
+
+HWBENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'HWBench')
+CPU_BENCHMARK_CSV = os.path.join(HWBENCH_DIR, 'GeekbenchCPU.csv')
+GPU_BENCHMARK_CSV = os.path.join(HWBENCH_DIR, 'geekbenchopencl-gpu.csv')
+BENCHMARK_INDEX_FILE = os.path.join(HWBENCH_DIR, 'hwbench_index.npz')
+
+
+def normalize_device_name(device_name):
+    """Case-fold a device name and collapse its whitespace for exact lookups."""
+    return " ".join(str(device_name).casefold().split())
+
+
+def file_digest(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_benchmark_csv(csv_file, name_column, score_columns):
+    """
+    Reads a benchmark CSV into a name array and one float score vector per score column.
+    """
+    names = []
+    scores = [[] for _ in score_columns]
+    with open(csv_file, 'r', newline='', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            names.append(row[name_column])
+            for values, col in zip(scores, score_columns):
+                value = (row[col] or '').replace(',', '').strip()
+                values.append(float(value) if value else np.nan)
+
+    return np.array(names, dtype=str), [np.array(values, dtype=float) for values in scores]
+
+
+class BenchmarkTable:
+    """
+    Device names and score vectors of one benchmark table.
+
+    Lookups return row positions, so callers fetch scores with plain array indexing. Fuzzy
+    matches are memoized per device name for the lifetime of the table.
+    """
+
+    def __init__(self, names, scores):
+        self.names = names
+        self.scores = scores
+        self.choices = names.tolist()
+        self.exact = {}
+        for position, name in enumerate(self.choices):
+            self.exact.setdefault(normalize_device_name(name), position)
+        self.match_cache = {}
+
+    def match(self, device_name, threshold=40):
+        """
+        Find the row of the best matching device.
+
+        Args:
+            device_name (str): The device name to match.
+            threshold (int): The minimum fuzz.ratio score to consider a valid fuzzy match.
+
+        Returns:
+            int: The row position of the match, or -1 if no match was found.
+        """
+        key = (device_name, threshold)
+        if key not in self.match_cache:
+            position = self.exact.get(normalize_device_name(device_name))
+            if position is None:
+                from rapidfuzz import fuzz, process
+
+                match = process.extractOne(device_name, self.choices, scorer=fuzz.ratio)
+                position = match[2] if match and match[1] >= threshold else -1
+            self.match_cache[key] = position
+        return self.match_cache[key]
+
+    def match_many(self, device_names, threshold=40):
+        """Return the row position for each device name (-1 for no match)."""
+        return np.array([self.match(name, threshold) for name in device_names], dtype=np.int64)
+
+    def lookup(self, positions, score_column):
+        """Gather the scores of ``score_column`` at ``positions``; -1 yields NaN."""
+        positions = np.asarray(positions, dtype=np.int64)
+        values = self.scores[score_column]
+        if len(values) == 0:
+            return np.full(positions.shape, np.nan)
+        return np.where(positions >= 0, values[np.maximum(positions, 0)], np.nan)
+
+
+class HardwareBenchmarkIndex:
+    """
+    Prebuilt CPU and GPU benchmark tables.
+
+    The tables are stored in ``HWBench/hwbench_index.npz``, built from the benchmark CSVs by
+    running ``python -m common.hw_benchmark_index``. The index remembers the digests of the CSVs
+    it was built from and is rebuilt in memory when they no longer match.
+    """
+
+    def __init__(self, cpu, gpu, sources=None):
+        self.cpu = cpu
+        self.gpu = gpu
+        self.sources = sources or {}
+
+    @classmethod
+    def from_csv(cls, cpu_csv=CPU_BENCHMARK_CSV, gpu_csv=GPU_BENCHMARK_CSV):
+        cpu_names, (single_core, multi_core) = read_benchmark_csv(cpu_csv, 'CPU', ['SingleCore', 'MultiCore'])
+        gpu_names, (gpu_score,) = read_benchmark_csv(gpu_csv, 'Device', ['Score'])
+        return cls(
+            BenchmarkTable(cpu_names, {'SingleCore': single_core, 'MultiCore': multi_core}),
+            BenchmarkTable(gpu_names, {'Score': gpu_score}),
+            sources={'cpu': file_digest(cpu_csv), 'gpu': file_digest(gpu_csv)},
+        )
+
+    @classmethod
+    def load(cls, index_file=BENCHMARK_INDEX_FILE):
+        with np.load(index_file, allow_pickle=False) as data:
+            return cls(
+                BenchmarkTable(data['cpu_names'], {'SingleCore': data['cpu_single_core'], 'MultiCore': data['cpu_multi_core']}),
+                BenchmarkTable(data['gpu_names'], {'Score': data['gpu_score']}),
+                sources={'cpu': str(data['cpu_source']), 'gpu': str(data['gpu_source'])},
+            )
+
+    def save(self, index_file=BENCHMARK_INDEX_FILE):
+        np.savez_compressed(
+            index_file,
+            cpu_names=self.cpu.names,
+            cpu_single_core=self.cpu.scores['SingleCore'],
+            cpu_multi_core=self.cpu.scores['MultiCore'],
+            gpu_names=self.gpu.names,
+            gpu_score=self.gpu.scores['Score'],
+            cpu_source=np.array(self.sources['cpu']),
+            gpu_source=np.array(self.sources['gpu']),
+        )
+
+
+_benchmark_index = None
+
+
+def get_benchmark_index():
+    """
+    Return the container-wide benchmark index, loading it on first use.
+    """
+    global _benchmark_index
+    if _benchmark_index is None:
+        sources = {'cpu': file_digest(CPU_BENCHMARK_CSV), 'gpu': file_digest(GPU_BENCHMARK_CSV)}
+        try:
+            index = HardwareBenchmarkIndex.load()
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Could not load benchmark index {BENCHMARK_INDEX_FILE}: {e}")
+            index = None
+
+        if index is None or index.sources != sources:
+            print("Building benchmark index from CSV files")
+            index = HardwareBenchmarkIndex.from_csv()
+        _benchmark_index = index
+    return _benchmark_index
+
+
+if __name__ == "__main__":
+    index = HardwareBenchmarkIndex.from_csv()
+    index.save()
+    print(f"Saved {len(index.cpu.names)} CPUs and {len(index.gpu.names)} GPUs to {BENCHMARK_INDEX_FILE}")
@@ -0,0 +1,58 @@
+import importlib
+import sys
+import threading
+import time
+
+
+_load_seconds = {}
+_load_lock = threading.Lock()
+
+
+def load_module(module_name):
+    """
+    Import a module on first use and remember how long that first import took.
+
+    Args:
+        module_name (str): Dotted module name
+
+    Returns:
+        module: The imported module
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    with _load_lock:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if module_name not in _load_seconds:
+            _load_seconds[module_name] = round(time.perf_counter() - start, 4)
+            print(f"Loaded {module_name} in {_load_seconds[module_name]:.3f}s")
+    return module
+
+
+def lazy_callable(module_name, name):
+    """
+    Stand-in for ``from module_name import name`` that defers the import to the first call.
+
+    Args:
+        module_name (str): Dotted module name
+        name (str): Function defined in that module
+
+    Returns:
+        callable: Function forwarding every call to ``module_name.name``
+    """
+    def call(*args, **kwargs):
+        return getattr(load_module(module_name), name)(*args, **kwargs)
+
+    call.__name__ = name
+    call.__qualname__ = name
+    call.__doc__ = f"Calls {module_name}.{name}, importing {module_name} on first use."
+    return call
+
+
+def load_timings():
+    """
+    Seconds spent importing each lazily loaded module in this process, in load order.
+    """
+    return dict(_load_seconds)
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def _call(fn, item):
+    try:
+        return fn(item), None
+    except Exception as e:
+        return None, e
+
+
+def parallel_map(fn, items, max_workers=None, use_processes=True):
+    """
+    Apply ``fn`` to every item on a worker pool and collect the outcomes in input order.
+
+    Every item yields a ``(result, error)`` pair, so one failing item never discards the results
+    of the others. When the pool cannot be started (AWS Lambda, for instance, provides no
+    ``/dev/shm`` for process-pool semaphores) or only one worker is useful, the items are
+    processed serially in the current process with the same contract.
+
+    Worker processes are forked, which keeps their start-up cheap, but only while the current
+    process runs a single thread: a child forked next to another thread (the report delivery
+    worker, for instance) can deadlock on a lock that thread held. Otherwise the items are
+    processed serially as well.
+
+    Args:
+        fn (callable): Function applied to each item; must be picklable when ``use_processes`` is set
+        items (iterable): Inputs to process
+        max_workers (int): Maximum number of workers, defaults to the number of CPUs
+        use_processes (bool): Use a process pool instead of a thread pool
+
+    Returns:
+        list[tuple]: One ``(result, error)`` pair per item, where exactly one of both is None
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(items))
+
+    if max_workers <= 1:
+        return [_call(fn, item) for item in items]
+
+    if use_processes and threading.active_count() > 1:
+        others = [thread.name for thread in threading.enumerate() if thread is not threading.current_thread()]
+        print(f"Not forking next to other threads ({', '.join(others)}), processing {len(items)} items serially")
+        return [_call(fn, item) for item in items]
+
+    try:
+        if use_processes:
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError, ImportError) as e:
+        print(f"Worker pool unavailable ({e}), processing {len(items)} items serially")
+        return [_call(fn, item) for item in items]
+
+    outcomes = []
+    with executor:
+        futures = [executor.submit(fn, item) for item in items]
+        for future in futures:
+            try:
+                outcomes.append((future.result(), None))
+            except Exception as e:
+                outcomes.append((None, e))
+
+    return outcomes
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# third-party packages whose import cost dominates a cold start
+HEAVY_MODULES = [
+    'numpy',
+    'pandas',
+    'causalbench',
+    'dowhy',
+    'networkx',
+    'sklearn',
+    'scipy.interpolate',
+    'scipy.spatial',
+    'reportlab',
+    'openpyxl',
+    'rapidfuzz',
+]
+
+# the handler module, every pipeline stage and the heavy packages on their own
+REPORT_MODULES = [
+    'lambda_function',
+    'helper_services.download_helper',
+    'helper_services.delivery_helper',
+    'helper_services.causal_analysis_helper',
+    'helper_services.g2s_causal_recommendation_helper',
+    'helper_services.report_helper',
+] + HEAVY_MODULES
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules]}))
+"""
+
+
+def measure_import(module_name, heavy_modules=None, python=None):
+    """
+    Import a module in a fresh interpreter and measure its cold import cost.
+
+    Args:
+        module_name (str): Dotted module name
+        heavy_modules (list): Modules reported as loaded when the import pulled them in,
+            defaults to HEAVY_MODULES
+        python (str): Interpreter to run, defaults to the current one
+
+    Returns:
+        dict: Module, import seconds, heavy modules loaded by the import and the error, if any
+    """
+    if heavy_modules is None:
+        heavy_modules = HEAVY_MODULES
+
+    result = subprocess.run(
+        [python or sys.executable, '-c', _PROBE, module_name, json.dumps(heavy_modules)],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+    )
+
+    record = {'module': module_name, 'seconds': None, 'loaded': [], 'error': None}
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        record['error'] = lines[-1] if lines else f"exit code {result.returncode}"
+        return record
+
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    record['seconds'] = round(probe['seconds'], 4)
+    record['loaded'] = [name for name in probe['loaded'] if name != module_name]
+    return record
+
+
+def startup_report(modules=None, repeat=1):
+    """
+    Measure the cold import cost of every module, keeping the fastest of ``repeat`` runs.
+
+    Args:
+        modules (list): Dotted module names, defaults to REPORT_MODULES
+        repeat (int): Number of fresh interpreters per module
+
+    Returns:
+        list[dict]: One record per module, see measure_import
+    """
+    report = []
+    for module_name in modules or REPORT_MODULES:
+        records = [measure_import(module_name) for _ in range(max(1, repeat))]
+        timed = [record for record in records if record['seconds'] is not None]
+        report.append(min(timed, key=lambda record: record['seconds']) if timed else records[-1])
+    return report
+
+
+def format_report(report):
+    lines = [f"{'module':<52} {'seconds':>8}  heavy modules loaded"]
+    for record in report:
+        if record['error']:
+            lines.append(f"{record['module']:<52} {'-':>8}  {record['error']}")
+        else:
+            lines.append(f"{record['module']:<52} {record['seconds']:>8.3f}  {', '.join(record['loaded']) or '-'}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the cold import cost of the Lambda entry point and its stages.")
+    parser.add_argument('modules', nargs='*', help="Modules to measure (defaults to the handler, its stages and heavy packages)")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per module, the fastest run is reported")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = startup_report(args.modules or None, repeat=args.repeat)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
@@ -2,10 +2,13 @@ import os
 import zipfile
 import csv
 import yaml
+import numpy as np
 import pandas as pd
-from rapidfuzz import process, fuzz
 from causalbench.modules import Dataset
 from causalbench.modules import Run
+from common.hw_benchmark_index import get_benchmark_index
+from common.parallel_helper import parallel_map
+from helper_services.hp_dtype_helper import collect_model_hp_dtypes
 
 
 # Set working directory to parent dir
@@ -96,22 +99,6 @@ def extract_information(results, profiling):
     return extracted_data, hyperparameter_list
 
 
-def write_headers(headers):
-    """
-    Initializes an empty DataFrame with the given headers as column names.
-    Returns:
-        df (pd.DataFrame): Empty DataFrame with specified columns.
-    """
-    try:
-        df = pd.DataFrame(columns=headers)
-        print("Headers have been successfully stored in an in-memory DataFrame.")
-        return df
-    except Exception as e:
-        print(f"Error creating DataFrame with headers: {e}")
-        # Return an empty DataFrame in case of error to keep downstream code safe
-        return pd.DataFrame()
-
-
 def edit_csv_header(csv_file, new_headers):
     """Edits the header row of an existing CSV file."""
     try:
@@ -138,48 +125,54 @@ def edit_csv_header(csv_file, new_headers):
         print(f"Error editing header in CSV file: {e}")
 
 
-def append_rows_to_df(extracted_data, hyperparameter_list, df):
+class RunTableBuilder:
     """
-    Appends rows of data (with hyperparameters) into the in-memory DataFrame `df`.
+    Append-only columnar accumulator for extracted run rows.
 
-    Parameters:
-    - extracted_data: List[List], each inner list is a row of values matching df’s non-HP columns.
-    - hyperparameter_list: List[Dict], each dict maps hyperparameter names to their values for the corresponding row.
-    - df: pd.DataFrame, existing table (may be empty) whose columns include your data headers
-          and any previously seen "HP.<name>" columns.
-
-    Returns:
-    - pd.DataFrame: the updated DataFrame with new rows and any new HP columns added.
+    Values are buffered per column and hyperparameter columns are registered the first time a
+    hyperparameter name is seen, so appending costs time proportional to the appended rows only.
+    The typed DataFrame is materialized once by ``to_frame``.
     """
-    # 1) Determine all needed HP columns
-    needed_hp_cols = {f"HP.{name}" for hp in hyperparameter_list for name in hp}
-
-    # 2) Add any missing HP columns to df (initialized to None)
-    for col in needed_hp_cols:
-        if col not in df.columns:
-            df[col] = None
-
-    # 3) Figure out which columns in df are the “base” (non-HP) columns
-    base_cols = [c for c in df.columns if not c.startswith("HP.")]
-
-    # 4) Build a list of new rows as dicts
-    new_rows = []
-    for row_vals, hp in zip(extracted_data, hyperparameter_list):
-        row_dict = {}
-        # map values to base columns
-        for idx, col in enumerate(base_cols):
-            row_dict[col] = row_vals[idx] if idx < len(row_vals) else None
-        # inject hyperparameters
-        for name, val in hp.items():
-            row_dict[f"HP.{name}"] = val
-        new_rows.append(row_dict)
-
-    # 5) Concatenate the new rows into df
-    new_df = pd.DataFrame(new_rows, columns=df.columns)
-    df = pd.concat([df, new_df], ignore_index=True)
-
-    print(f"Appended {len(new_rows)} rows to in-memory DataFrame.")
-    return df
+
+    def __init__(self, headers):
+        self.headers = list(headers)
+        self.columns = {header: [] for header in self.headers}
+        self.hp_columns = {}
+        self.row_count = 0
+
+    def append(self, extracted_data, hyperparameter_list):
+        """
+        Append rows of data with their hyperparameters.
+
+        Parameters:
+        - extracted_data: List[List], each inner list is a row of values matching the headers.
+        - hyperparameter_list: List[Dict], each dict maps hyperparameter names to their values for the corresponding row.
+        """
+        for row_vals, hp in zip(extracted_data, hyperparameter_list):
+            # map values to base columns
+            for idx, col in enumerate(self.headers):
+                self.columns[col].append(row_vals[idx] if idx < len(row_vals) else None)
+
+            # inject hyperparameters, padding columns registered after earlier rows
+            for name, val in hp.items():
+                values = self.hp_columns.setdefault(f"HP.{name}", [])
+                values.extend([None] * (self.row_count - len(values)))
+                values.append(val)
+
+            self.row_count += 1
+
+    def to_frame(self):
+        """
+        Materialize the accumulated rows.
+
+        Returns:
+        - pd.DataFrame: the base columns followed by the "HP.<name>" columns in first-seen order.
+        """
+        data = dict(self.columns)
+        for col, values in self.hp_columns.items():
+            data[col] = values + [None] * (self.row_count - len(values))
+
+        return pd.DataFrame(data, columns=self.headers + list(self.hp_columns))
 
 
 def dataset_extract(id, version):
@@ -202,119 +195,124 @@ def dataset_extract(id, version):
     return len(yaml_data["files"]["file1"]["columns"]), number_of_rows
 
 
-def process_yaml(yaml_file, df):
-    """Process a single yaml file: parse YAML, and write data to CSV."""
-    # Read and process the YAML file
-    try:
-        run: Run = Run(zip_file=yaml_file)
-        # Extract data from the results and profiling sections
-        results = run.results
-        profiling = run.profiling
-        extracted_data, hyperparameters = extract_information(results, profiling)
-
-        # Append extracted data as rows to the CSV file
-        df = append_rows_to_df(extracted_data, hyperparameters, df)
-    except Exception as e:
-        print(f"Error processing {yaml_file}: {e}")
-    finally:
-        return df
-
-
-def process_multiple_yamls(yaml_directory, headers):
-    # Write headers to the CSV file only once
-    df = write_headers(headers)
-
-    # Loop over each .zip file in the specified directory
-    for filename in os.listdir(yaml_directory):
-        if filename.endswith('.zip'):
-            yaml_file_path = os.path.join(yaml_directory, filename)
-            print(f"Processing {yaml_file_path}...")
-            df = process_yaml(yaml_file_path, df)
+def ingest_archive(yaml_file):
+    """
+    Parse a single run archive into a compact, picklable row batch.
+
+    Runs in a worker process, so it only returns plain rows, hyperparameters and the
+    (id, version) keys of the models used; model metadata is fetched by the parent.
+    """
+    run: Run = Run(zip_file=yaml_file)
+    extracted_data, hyperparameters = extract_information(run.results, run.profiling)
+    model_keys = [(result.model.id, result.model.version) for result in run.results]
+    return {"rows": extracted_data, "hyperparameters": hyperparameters, "model_keys": model_keys}
+
+
+def process_multiple_yamls(yaml_directory, headers, hp_dtype=None, max_workers=None):
+    """
+    Parse every .zip file in the directory, spreading the archives across a process pool.
+
+    Batches are merged in sorted file name order, so the resulting DataFrame does not depend on
+    which worker finishes first. An archive that fails to parse is reported and skipped.
+
+    Args:
+        yaml_directory (str): Directory containing the run archives
+        headers (list): Base column names
+        hp_dtype (dict): Optional dictionary filled with hyperparameter data types
+        max_workers (int): Maximum number of worker processes, defaults to the number of CPUs
+    """
+    table = RunTableBuilder(headers)
+    model_cache = dict()
+
+    # Collect each .zip file in the specified directory
+    yaml_file_paths = [os.path.join(yaml_directory, filename)
+                       for filename in sorted(os.listdir(yaml_directory))
+                       if filename.endswith('.zip')]
+    print(f"Processing {len(yaml_file_paths)} ZIP files...")
+
+    batches = parallel_map(ingest_archive, yaml_file_paths, max_workers=max_workers)
+
+    for yaml_file_path, (batch, error) in zip(yaml_file_paths, batches):
+        if error is not None:
+            print(f"Error processing {yaml_file_path}: {error}")
+            continue
+
+        table.append(batch["rows"], batch["hyperparameters"])
+
+        if hp_dtype is not None:
+            try:
+                collect_model_hp_dtypes(batch["model_keys"], hp_dtype, model_cache)
+            except Exception as e:
+                print(f"Error collecting hyperparameter data types for {yaml_file_path}: {e}")
+
+    # Build the DataFrame once all batches are merged
+    df = table.to_frame()
+    print(f"Collected {len(df)} rows into in-memory DataFrame.")
     
     return df
 
 
-def merge_benchmark_data(df, cpu_benchmark_df, gpu_benchmark_df):
+def merge_benchmark_data(df, benchmark_index=None):
     """
     Merges CPU and GPU benchmark data into your in-memory DataFrame.
 
     Parameters:
     - df: pd.DataFrame with at least 'CPU Name' and 'GPU Name' columns.
-    - cpu_benchmark_df: pd.DataFrame of CPU benchmarks, with columns like 'CPU', 'SingleCore', 'MultiCore'.
-    - gpu_benchmark_df: pd.DataFrame of GPU benchmarks, with columns like 'Device', 'Score'.
+    - benchmark_index: HardwareBenchmarkIndex to match against, defaults to the container-wide index.
 
     Returns:
     - pd.DataFrame: the original df plus 'HW.CPUSingleCore', 'HW.CPUMultiCore', 'HW.GPUScore'.
     """
-    # 1) Ensure the HW columns exist
-    for col in ['SingleCore', 'MultiCore']:
-        hw_col = f"HW.CPU{col}"
-        if hw_col not in df.columns:
-            df[hw_col] = None
+    if benchmark_index is None:
+        benchmark_index = get_benchmark_index()
+
+    # 1) Match each distinct device name once and gather the scores by table position
+    if 'CPU Name' in df.columns:
+        positions = match_positions(df['CPU Name'], benchmark_index.cpu)
+        for col in ['SingleCore', 'MultiCore']:
+            df[f"HW.CPU{col}"] = benchmark_index.cpu.lookup(positions, col)
 
-    for col in ['Score']:
-        hw_col = f"HW.GPU{col}"
+    if 'GPU Name' in df.columns:
+        positions = match_positions(df['GPU Name'], benchmark_index.gpu)
+        df["HW.GPUScore"] = benchmark_index.gpu.lookup(positions, 'Score')
+
+    # 2) Ensure the HW columns exist
+    for hw_col in ['HW.CPUSingleCore', 'HW.CPUMultiCore', 'HW.GPUScore']:
         if hw_col not in df.columns:
             df[hw_col] = None
 
-    # 2) For each row, fuzzy-match and fill in benchmark values
-    for idx, row in df.iterrows():
-        cpu_name = row.get('CPU Name')
-        if pd.notna(cpu_name):
-            cpu_match = fuzzy_match_device(cpu_name, cpu_benchmark_df, 'CPU')
-            if cpu_match is not None:
-                for col in ['SingleCore', 'MultiCore']:
-                    df.at[idx, f"HW.CPU{col}"] = cpu_match.get(col)
-
-        gpu_name = row.get('GPU Name')
-        if pd.notna(gpu_name):
-            gpu_match = fuzzy_match_device(gpu_name, gpu_benchmark_df, 'Device')
-            if gpu_match is not None:
-                df.at[idx, "HW.GPUScore"] = gpu_match.get('Score')
-
     # 3) Drop the old name columns if you no longer need them
     df = df.drop(columns=['CPU Name', 'GPU Name'], errors='ignore')
 
     return df
 
 
-def fuzzy_match_device(device_name, benchmark_df, column_name, threshold=40):
+def match_positions(device_names, benchmark_table):
     """
-    Performs fuzzy matching to find the best match for a given device name in the benchmark DataFrame.
-
-    Args:
-    device_name (str): The device name to match.
-    benchmark_df (DataFrame): The DataFrame containing benchmark data.
-    column_name (str): The column in the benchmark DataFrame that contains device names.
-    threshold (int): The minimum score to consider a valid match (default is 80).
+    Matches every distinct device name once and broadcasts the table positions back to the rows.
 
     Returns:
-    dict: The row from the benchmark_df that best matches the device name, or None if no match found.
+    - np.ndarray: benchmark table position per row, -1 for missing or unmatched names.
     """
-    # Use rapidfuzz's process.extractOne for fuzzy matching
-    match = process.extractOne(device_name, benchmark_df[column_name], scorer=fuzz.ratio)
+    codes, unique_names = pd.factorize(device_names)
+    if len(unique_names) == 0:
+        return np.full(len(codes), -1, dtype=np.int64)
+
+    matched = benchmark_table.match_many(unique_names)
+    return np.where(codes >= 0, matched[np.maximum(codes, 0)], -1)
 
-    # Check if the match meets the threshold
-    if match and match[1] >= threshold:
-        matched_device = benchmark_df[benchmark_df[column_name] == match[0]]
-        return matched_device.iloc[0]  # Return the best match
-    return None
 
+def main(yaml_directory, headers, hp_dtype=None, max_workers=None):
+    """
+    Main function to process multiple zip files and write results to a CSV.
 
-def main(yaml_directory, headers):
-    """Main function to process multiple zip files and write results to a CSV."""
-    df = process_multiple_yamls(yaml_directory, headers)
+    Pass a dictionary as ``hp_dtype`` to also collect hyperparameter data types in the same pass.
+    """
+    df = process_multiple_yamls(yaml_directory, headers, hp_dtype, max_workers)
     print(df)
 
     # Merge benchmark data with the final CSV
-    cpu_benchmark_csv = os.path.join(os.path.dirname(__file__), '..', 'HWBench', 'GeekbenchCPU.csv')
-    gpu_benchmark_csv = os.path.join(os.path.dirname(__file__), '..', 'HWBench', 'geekbenchopencl-gpu.csv')
-    
-    print(f"Loading CPU benchmark data from {cpu_benchmark_csv}")
-    print(f"Loading GPU benchmark data from {gpu_benchmark_csv}")
-    cpu_benchmark_df = pd.read_csv(cpu_benchmark_csv)
-    gpu_benchmark_df = pd.read_csv(gpu_benchmark_csv)
-    merged_df = merge_benchmark_data(df, cpu_benchmark_df, gpu_benchmark_df)
+    merged_df = merge_benchmark_data(df, get_benchmark_index())
 
     return merged_df
 
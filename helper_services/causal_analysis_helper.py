@@ -3,14 +3,15 @@ import os
 from urllib.parse import urlparse
 import pandas as pd
 import numpy as np
-import networkx as nx
-from dowhy import CausalModel
-from common.common_constants import RANDOM_SEED
+from common.common_constants import CAUSAL_ESTIMATOR, RANDOM_SEED
+from common.parallel_helper import parallel_map
 from common.yaml_to_csv import main as process_yaml_data, headers
-from sklearn.preprocessing import LabelEncoder, StandardScaler
 
 
 def compute_CATE(data, treatment, outcome, graph):
+    # DoWhy is only needed by the per-feature estimator, so it is not loaded on the linear path
+    from dowhy import CausalModel
+
     try:
         data_clean = data.copy()
         
@@ -50,7 +51,74 @@ def compute_CATE(data, treatment, outcome, graph):
         return np.nan
 
 
-def compute_score(data, features, outcome_column):
+def compute_linear_effects(data, features, outcome):
+    """
+    Closed-form equivalent of compute_CATE for every feature of the star graph at once.
+
+    On the graph built in compute_score, DoWhy's backdoor.linear_regression regresses the outcome
+    on the treatment and its products with the remaining features (the effect modifiers), then
+    averages the effect of a unit treatment change over the data: b_t + sum_j b_tj * mean(w_j).
+    The per-feature design matrices are stacked and solved with one batched pseudo-inverse using
+    the same cutoff as statsmodels' OLS, so rank-deficient designs resolve the same way. Rows with
+    missing values in any feature or the outcome are ignored.
+    """
+    features = sorted(features)
+    effects = pd.Series(np.nan, index=features, dtype=float)
+    if not features:
+        return effects
+
+    X = data[features].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    y = pd.to_numeric(data[outcome], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    X, y = X[valid], y[valid]
+
+    n_rows, n_features = X.shape
+    if n_rows == 0 or np.unique(y).size < 2:
+        return effects
+
+    varying = [i for i in range(n_features) if np.unique(X[:, i]).size >= 2]
+    others = [[j for j in range(n_features) if j != i] for i in range(n_features)]
+
+    # bound the stacked designs to roughly 64 MB per batch
+    batch_size = max(1, int(64e6 // (8 * n_rows * (n_features + 1))))
+    for start in range(0, len(varying), batch_size):
+        batch = varying[start:start + batch_size]
+
+        designs = np.empty((len(batch), n_rows, n_features + 1))
+        designs[:, :, 0] = 1.0
+        for b, i in enumerate(batch):
+            designs[b, :, 1] = X[:, i]
+            designs[b, :, 2:] = X[:, [i]] * X[:, others[i]]
+
+        coefficients = np.linalg.pinv(designs, rcond=1e-15) @ y
+
+        for b, i in enumerate(batch):
+            modifier_means = X[:, others[i]].mean(axis=0)
+            effects[features[i]] = coefficients[b, 1] + coefficients[b, 2:] @ modifier_means
+
+    return effects
+
+
+def compute_score(data, features, outcome_column, estimator=None):
+    """
+    Estimate the effect of every feature on the outcome.
+
+    Args:
+        data (pd.DataFrame): Features and outcome
+        features (list): Feature columns
+        outcome_column (str): Outcome column
+        estimator (str): "linear" for the closed-form batched estimator, "dowhy" for one DoWhy
+            model per feature, or "verify" to run both, report their largest difference and
+            return the DoWhy estimates; defaults to CAUSAL_ESTIMATOR
+
+    Returns:
+        pd.DataFrame: One effect per feature, indexed by the sorted feature names
+    """
+    if estimator is None:
+        estimator = CAUSAL_ESTIMATOR
+    if estimator not in ('linear', 'dowhy', 'verify'):
+        raise ValueError(f"Unknown causal estimator: {estimator}")
+
     data = data.copy()
     
     cols_to_drop = []
@@ -61,24 +129,128 @@ def compute_score(data, features, outcome_column):
     if cols_to_drop:
         data = data.drop(columns=cols_to_drop)
 
+    scores = np.zeros(shape=(len(features), 1))
+    scores = pd.DataFrame(scores, index=sorted(features), columns=[outcome_column])
+
+    if estimator in ('linear', 'verify'):
+        linear_effects = compute_linear_effects(data, features, outcome_column)
+
+    if estimator == 'linear':
+        scores[outcome_column] = linear_effects
+        return scores
+
+    import networkx as nx
+
     G = nx.DiGraph()
     for feature in sorted(features):
         G.add_edge(feature, outcome_column)
 
-    scores = np.zeros(shape=(len(features), 1))
-    scores = pd.DataFrame(scores, index=sorted(features), columns=[outcome_column])
-
     for feature in sorted(features):
         scores.loc[feature, outcome_column] = compute_CATE(data, feature, outcome_column, G)
 
+    if estimator == 'verify':
+        differences = (scores[outcome_column] - linear_effects).abs()
+        mismatched = scores[outcome_column].isna() != linear_effects.isna()
+        print(f"Estimator verification: max |dowhy - linear| = {differences.max()}, NaN mismatches = {int(mismatched.sum())}")
+
     return scores
 
 
+def load_run_data(download_dir):
+    """
+    Parse every run archive in the directory once.
+
+    Args:
+        download_dir (string): Path to directory containing ZIP files to analyze
+
+    Returns:
+        tuple: Extracted rows as a DataFrame (None without a directory) and the hyperparameter data types
+    """
+    hp_dtypes = dict()
+    if not download_dir:
+        return None, hp_dtypes
+
+    print(f"Processing ZIP files from {download_dir}")
+    raw_df = process_yaml_data(download_dir, headers, hp_dtype=hp_dtypes)
+
+    return raw_df, hp_dtypes
+
+
+def analyze_group(task):
+    """
+    Normalize one group's features and estimate their effects on the outcome.
+
+    Runs in a worker process, so it only receives the group's numeric arrays.
+
+    Args:
+        task (tuple): Numeric column names, numeric values, outcome values, features and estimator
+
+    Returns:
+        dict: Effect per feature, sorted by decreasing magnitude
+    """
+    numeric_cols, numeric_values, outcome_values, features, estimator = task
+
+    analysis_data = pd.DataFrame(numeric_values, columns=numeric_cols)
+    analysis_data['outcome'] = outcome_values
+
+    if numeric_cols:
+        from sklearn.preprocessing import StandardScaler
+
+        analysis_data[numeric_cols] = StandardScaler().fit_transform(analysis_data[numeric_cols])
+        print("Features normalized using StandardScaler")
+
+    score = compute_score(analysis_data, features, 'outcome', estimator)
+
+    effects = {}
+    for feature in score.index:
+        effects[feature] = round(float(score.loc[feature, 'outcome']), 8)
+
+    return dict(sorted(effects.items(), key=lambda x: abs(x[1]), reverse=True))
+
+
+def build_analysis_frame(raw_df, features, outcome_column, group_by_metric):
+    """
+    Select, rename and scale the raw run columns into the analysis layout.
+
+    Args:
+        raw_df (pd.DataFrame): Rows extracted from the run archives
+        features (list): Feature columns to keep
+        outcome_column (str): Column holding the outcome; Time.Duration is converted from nanoseconds to seconds
+        group_by_metric (bool): Also keep the model and metric names
+
+    Returns:
+        pd.DataFrame: dataset, optional model/metric, features and outcome columns, one row per raw row
+    """
+    def column(name, default=None):
+        if name in raw_df.columns:
+            return raw_df[name]
+        return pd.Series(default, index=raw_df.index, dtype=object)
+
+    columns = {'dataset': column('DS.Name')}
+
+    if group_by_metric:
+        columns['model'] = column('Model.Name', 'Unknown')
+        columns['metric'] = column('Metric.Name', 'Unknown')
+
+    for feature in features:
+        columns[feature] = column(feature)
+
+    outcome = pd.to_numeric(column(outcome_column), errors='raise').astype(float)
+    if outcome_column == "Time.Duration":
+        outcome = outcome / 1e9
+    columns['outcome'] = outcome
+
+    return pd.DataFrame(columns, index=raw_df.index)
+
+
 def run_causal_analysis(download_dir,
                         data_types=None,
                         candidates=None, 
                         outcome_column=None,
-                        logger=None):
+                        logger=None,
+                        raw_df=None,
+                        estimator=None,
+                        max_workers=None):
     """
     Run causal analysis on data from the provided ZIP URLs.
     
@@ -87,6 +259,9 @@ def run_causal_analysis(download_dir,
         candidates (list): List of candidate feature column names to analyze
         outcome_column (str): Column name for the outcome variable to analyze
         output_filename (str): Name of the output YAML file
+        raw_df (pd.DataFrame): Rows already extracted by load_run_data; the ZIP files are parsed again when omitted
+        estimator (str): Effect estimator passed to compute_score ("linear", "dowhy" or "verify")
+        max_workers (int): Maximum number of processes analyzing metric groups in parallel
     
     Returns:
         dict: Analysis results
@@ -122,12 +297,17 @@ def run_causal_analysis(download_dir,
     data_types['GPUScore'] = 'decimal'
     
     encode = []
-    raw_df = pd.DataFrame()
+    features = []
+    preloaded = raw_df is not None
+    if not preloaded:
+        raw_df = pd.DataFrame()
     hyperparameters = []
     experiment_count = 0
     load_error = None
     try:
-        if download_dir:
+        if preloaded:
+            print(f"Using {len(raw_df)} pre-parsed rows from {download_dir}")
+        elif download_dir:
             print(f"Processing ZIP files from {download_dir}")
             raw_df = process_yaml_data(download_dir, headers)
         else:
@@ -181,36 +361,12 @@ def run_causal_analysis(download_dir,
     else:
         df_columns = ['dataset'] + features + ['outcome']
     
-    df = pd.DataFrame(columns=df_columns)
-
-    for index, row in raw_df.iterrows():
-        new_row = []
-        
-        new_row.append(row['DS.Name']) 
-        
-        if group_by_metric:
-            new_row.append(row.get('Model.Name', 'Unknown'))
-            new_row.append(row.get('Metric.Name', 'Unknown'))
-
-        for feature in features:
-            if feature in row.index and pd.notna(row[feature]):
-                new_row.append(row[feature])
-            else:
-                new_row.append(None)
-        
-        if outcome_column in row.index and pd.notna(row[outcome_column]):
-            if outcome_column=="Time.Duration":
-                new_row.append(float(row[outcome_column])/1e9)
-            else:
-                new_row.append(float(row[outcome_column]))
-
-        else:
-            new_row.append(None)
-        
-        df.loc[index] = new_row
+    df = build_analysis_frame(raw_df, features, outcome_column, group_by_metric)[df_columns]
 
     for index, feature in enumerate(features):
         if index in encode:
+            from sklearn.preprocessing import LabelEncoder
+
             label_encoder = LabelEncoder()
             label_encoder.random_state = RANDOM_SEED 
             df[feature] = label_encoder.fit_transform(df[feature])
@@ -222,8 +378,6 @@ def run_causal_analysis(download_dir,
 
     df = df.sort_values(['dataset'] + [col for col in sorted(df.columns) if col != 'dataset']).reset_index(drop=True)
 
-    scaler = StandardScaler()
-
     exclude_cols = ['dataset', 'outcome']
     if group_by_metric:
         exclude_cols.extend(['model', 'metric'])
@@ -240,10 +394,16 @@ def run_causal_analysis(download_dir,
 
     group_results = defaultdict(lambda: defaultdict(dict))
 
+    def group_task(analysis_data):
+        numeric_values = analysis_data[numeric_cols].to_numpy(dtype=float)
+        outcome_values = analysis_data['outcome'].to_numpy(dtype=float)
+        return numeric_cols, numeric_values, outcome_values, features, estimator
+
     if group_by_metric:
         grouped = df.groupby('metric')
         print(f"Found {len(grouped)} unique metrics")
         
+        tasks = {}
         for metric, group_data in grouped:
             try:
                 group_key = f"{metric}"
@@ -252,24 +412,25 @@ def run_causal_analysis(download_dir,
 
                 group_results[group_key]['data'] = analysis_data.copy(deep=True)
 
-                if numeric_cols:
-                    analysis_data[numeric_cols] = scaler.fit_transform(analysis_data[numeric_cols])
-                    print("Features normalized using StandardScaler")
-                
-                score = compute_score(analysis_data, features, 'outcome')
-
-                for feature in score.index:
-                    effect_value = score.loc[feature, 'outcome']
-                    group_results[group_key]['effects'][feature] = round(float(effect_value), 8)
-                
-                group_results[group_key]['effects'] = dict(sorted(group_results[group_key]['effects'].items(), key=lambda x: abs(x[1]), reverse=True))
-
-                group_results[group_key]['experiments'] = len(analysis_data)
-
-                print(f"Analyzed {group_key}: {len(analysis_data)} experiments")
+                tasks[group_key] = group_task(analysis_data)
             
             except Exception as e:
                 print(f"Error analyzing {metric}: {e}")
+
+        # analyze the groups in parallel, one failing group does not affect the others
+        group_keys = sorted(tasks)
+        outcomes = parallel_map(analyze_group, [tasks[group_key] for group_key in group_keys], max_workers=max_workers)
+
+        for group_key, (effects, error) in zip(group_keys, outcomes):
+            if error is not None:
+                print(f"Error analyzing {group_key}: {error}")
+                continue
+
+            group_results[group_key]['effects'] = effects
+
+            group_results[group_key]['experiments'] = len(group_results[group_key]['data'])
+
+            print(f"Analyzed {group_key}: {group_results[group_key]['experiments']} experiments")
     
     else:
         try:
@@ -279,17 +440,7 @@ def run_causal_analysis(download_dir,
 
             group_results[group_key]['data'] = analysis_data.copy(deep=True)
 
-            if numeric_cols:
-                analysis_data[numeric_cols] = scaler.fit_transform(analysis_data[numeric_cols])
-                print("Features normalized using StandardScaler")
-            
-            score = compute_score(analysis_data, features, 'outcome')
-            
-            for feature in score.index:
-                effect_value = score.loc[feature, 'outcome']
-                group_results[group_key]['effects'][feature] = round(float(effect_value), 8)
-            
-            group_results[group_key]['effects'] = dict(sorted(group_results[group_key]['effects'].items(), key=lambda x: abs(x[1]), reverse=True))
+            group_results[group_key]['effects'] = analyze_group(group_task(analysis_data))
 
             group_results[group_key]['experiments'] = len(analysis_data)
 
@@ -1,11 +1,14 @@
 import math
 import numpy as np
 import itertools
-from sklearn.preprocessing import StandardScaler
+from scipy.spatial import cKDTree
 
 from common.common_constants import RANDOM_SEED
 
 
+GRID_CHUNK_ROWS = 1 << 16
+
+
 # def is_likely_int(min_v, max_v):
 #     return (
 #         math.isclose(min_v, round(min_v), abs_tol=1e-9) and
@@ -36,15 +39,16 @@ def distribute_points(dimensions, max_points):
     return dimensions
 
 
-def generate_grid_points(dimensions, hp_dtypes):
+def grid_axes(dimensions, hp_dtypes):
     """
-    Generates grid points based on dimension configs with point counts.
+    Generates the values of every grid axis based on dimension configs with point counts.
 
     Args:
         dimensions (list of dict): Each dict has 'min_val', 'max_val', 'point_count'.
+        hp_dtypes: Hyperparameter datatype dictionary.
 
     Returns:
-        list of tuples: grid points.
+        list of lists: grid values per dimension.
     """
     grids = []
     for dim in dimensions:
@@ -61,13 +65,87 @@ def generate_grid_points(dimensions, hp_dtypes):
             vals = np.linspace(min_v, max_v, count)
             grids.append(np.round(vals).astype(int).tolist() if is_int else vals.tolist())
 
-    grid_points = list(itertools.product(*grids))
+    return grids
+
+
+def generate_grid_points(dimensions, hp_dtypes):
+    """
+    Generates grid points based on dimension configs with point counts.
+
+    Args:
+        dimensions (list of dict): Each dict has 'min_val', 'max_val', 'point_count'.
+
+    Returns:
+        list of tuples: grid points.
+    """
+    grid_points = list(itertools.product(*grid_axes(dimensions, hp_dtypes)))
 
     return grid_points
 
 
-def weight_recommendations(data, grid_points):
-    # data and grid_points should be lists/arrays of shape (n_samples, n_features)
+def iter_grid_chunks(grids, chunk_size=GRID_CHUNK_ROWS):
+    """
+    Yields the Cartesian grid as float arrays of at most chunk_size rows, in itertools.product order.
+
+    Args:
+        grids (list of lists): grid values per dimension.
+        chunk_size (int): Maximum number of grid points per chunk.
+
+    Returns:
+        generator of np.ndarray: chunks of shape (n_rows, n_features).
+    """
+    axes = [np.asarray(values, dtype=float) for values in grids]
+    sizes = [len(values) for values in axes]
+    total = math.prod(sizes)
+
+    for start in range(0, total, chunk_size):
+        indices = np.unravel_index(np.arange(start, min(start + chunk_size, total)), sizes)
+        yield np.column_stack([values[idx] for values, idx in zip(axes, indices)])
+
+
+def grid_scaling(data, grids):
+    """
+    Computes the StandardScaler mean and scale of the observed points and the full grid together,
+    without materializing the grid: every value of an axis occurs total / len(axis) times.
+
+    Args:
+        data (np.ndarray): Observed points of shape (n_samples, n_features).
+        grids (list of lists): grid values per dimension.
+
+    Returns:
+        np.ndarray: mean per feature.
+        np.ndarray: scale per feature.
+    """
+    total = math.prod(len(values) for values in grids)
+    n_points = data.shape[0] + total
+
+    mean = np.empty(len(grids))
+    var = np.empty(len(grids))
+    for j, values in enumerate(grids):
+        values = np.asarray(values, dtype=float)
+        repeats = total // len(values)
+        mean[j] = (data[:, j].sum() + repeats * values.sum()) / n_points
+        var[j] = (((data[:, j] - mean[j]) ** 2).sum() + repeats * ((values - mean[j]) ** 2).sum()) / n_points
+
+    scale = np.sqrt(var)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def weight_recommendations(data, grid_points, workers=1):
+    """
+    Appends to each grid point its distance to the nearest observed point.
+
+    Args:
+        data (array-like): Observed points of shape (n_samples, n_features).
+        grid_points (list of tuples): Grid points of shape (n_grid, n_features).
+        workers (int): Number of threads for the nearest-neighbour queries, -1 uses all CPUs.
+
+    Returns:
+        list of tuples: grid points with trailing min_dist.
+    """
+    from sklearn.preprocessing import StandardScaler
+
     scaler = StandardScaler()
     all_points = np.vstack([data, grid_points])
     scaler.fit(all_points)  # fit on combined set or only on data depending on choice
@@ -75,34 +153,75 @@ def weight_recommendations(data, grid_points):
     data_s = scaler.transform(data)
     grid_s = scaler.transform(grid_points)
 
+    # distance to the nearest current point in scaled space, for all grid points at once
+    min_dists, _ = cKDTree(data_s).query(grid_s, k=1, workers=workers)
+
     grid_points_dist = []
-    for gp, gp_s in zip(grid_points, grid_s):
-        # compute distance to all current points in scaled space
-        min_dist = round(float(np.linalg.norm(data_s - gp_s, axis=1).min()), 8)
-        grid_points_dist.append(gp + (min_dist,))
+    for gp, min_dist in zip(grid_points, min_dists.tolist()):
+        grid_points_dist.append(gp + (round(min_dist, 8),))
 
     return grid_points_dist
 
 
-def run_causal_recommendation(data, dimensions, hp_dtypes, max_points):
+def select_top_grid_points(points, min_dists, top_n):
+    """
+    Returns the row indices of the top_n points by decreasing min_dist (rounded to 8 decimals), then increasing values.
+    """
+    sort_keys = [points[:, j] for j in reversed(range(points.shape[1]))]
+    order = np.lexsort(sort_keys + [-np.round(min_dists, 8)])
+    return order[:top_n]
+
+
+def run_causal_recommendation(data, dimensions, hp_dtypes, max_points, workers=1, top_n=None, chunk_size=GRID_CHUNK_ROWS):
     """
     Main function to run causal recommendation.
 
+    The grid is generated and scored chunk by chunk, keeping only the running top_n points, so memory
+    does not grow with the size of the grid.
+
     Args:
         dimensions (list of dict): Each dict has 'strength', 'min_val', 'max_val'.
         hp_dtypes: Hyperparameter datatype dictionary.
         max_points (int): Max allowed total points.
+        workers (int): Number of threads for the nearest-neighbour queries.
+        top_n (int): Number of recommendations to return, defaults to max_points.
+        chunk_size (int): Number of grid points scored at once.
 
     Returns:
         list of tuples: grid points.
         int: total points used.
     """
+    if top_n is None:
+        top_n = max_points
+
     dimensions = distribute_points(dimensions, max_points)
 
-    grid_points = generate_grid_points(dimensions, hp_dtypes)
+    grids = grid_axes(dimensions, hp_dtypes)
+    is_int = [hp_dtypes[dim] == 'integer' for dim in dimensions]
 
-    grid_points = weight_recommendations(data, grid_points)
+    data = np.asarray(data, dtype=float)
+    mean, scale = grid_scaling(data, grids)
+    tree = cKDTree((data - mean) / scale)
+
+    best_points = np.zeros((0, len(grids)))
+    best_dists = np.zeros(0)
+    for chunk in iter_grid_chunks(grids, chunk_size):
+        # distance to the nearest current point in scaled space
+        min_dists, _ = tree.query((chunk - mean) / scale, k=1, workers=workers)
+
+        if 0 < top_n <= len(best_dists):
+            # points closer than the current cut-off can never enter the top_n
+            keep = np.round(min_dists, 8) >= np.round(best_dists[-1], 8)
+            chunk, min_dists = chunk[keep], min_dists[keep]
+
+        points = np.vstack([best_points, chunk])
+        dists = np.concatenate([best_dists, min_dists])
+        order = select_top_grid_points(points, dists, top_n)
+        best_points, best_dists = points[order], dists[order]
+
+    grid_points = []
+    for gp, min_dist in zip(best_points.tolist(), best_dists.tolist()):
+        values = tuple(int(v) if integer else v for v, integer in zip(gp, is_int))
+        grid_points.append(values + (round(min_dist, 8),))
 
-    grid_points = sorted(grid_points, key=lambda x: (-x[-1], x[:-1]))
-    
     return grid_points
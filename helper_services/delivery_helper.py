@@ -0,0 +1,299 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from common.common_constants import (
+    CONTAINER_TMP_DIR,
+    DELIVERY_MAX_ATTEMPTS,
+    DELIVERY_RETRY_BASE_SECONDS,
+    DELIVERY_SENT_RETENTION_SECONDS,
+)
+from helper_services.mail_helper import send_email
+
+
+# Container-local by default; drain_handler runs in other execution environments and only sees
+# tickets left behind here when CAUSALBENCH_OUTBOX_DIR points at shared storage such as EFS
+OUTBOX_DIR = os.environ.get("CAUSALBENCH_OUTBOX_DIR", os.path.join(CONTAINER_TMP_DIR, "causalbench_outbox"))
+OUTBOX_IS_SHARED = "CAUSALBENCH_OUTBOX_DIR" in os.environ
+
+MANIFEST_NAME = "manifest.json"
+FAILED_DIR_NAME = "failed"
+SENT_DIR_NAME = "sent"
+SENT_STATUS = "Email sent successfully."
+
+_worker = None
+_worker_lock = threading.Lock()
+_drain_lock = threading.Lock()
+
+
+def _write_manifest(ticket_dir, manifest):
+    manifest_path = os.path.join(ticket_dir, MANIFEST_NAME)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+
+def _read_manifest(ticket_dir):
+    with open(os.path.join(ticket_dir, MANIFEST_NAME), "r") as f:
+        return json.load(f)
+
+
+def enqueue_report(to, subject, body, attachments=None, outbox_dir=OUTBOX_DIR, start_worker=True):
+    """
+    Put a report email into the outbox and return without waiting for SMTP.
+
+    The attachments are copied into the ticket directory, so the outbox does not depend on the
+    per-request workspace. A background worker starts draining the outbox right away; callers that
+    must know the outcome before returning wait for it with wait_for_delivery.
+
+    :param to: Recipient address
+    :param subject: Email subject
+    :param body: Plain-text body
+    :param attachments: Paths of the files to attach
+    :param outbox_dir: Outbox directory
+    :param start_worker: Start the background delivery worker
+    :return: Delivery ticket
+    """
+    ticket = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex}"
+    ticket_dir = os.path.join(outbox_dir, ticket)
+    os.makedirs(ticket_dir)
+
+    attachment_names = []
+    for attachment in attachments or []:
+        name = os.path.basename(attachment)
+        shutil.copyfile(attachment, os.path.join(ticket_dir, name))
+        attachment_names.append(name)
+
+    _write_manifest(ticket_dir, {
+        "ticket": ticket,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "attachments": attachment_names,
+        "attempts": 0,
+        "next_attempt": 0,
+        "last_status": None,
+    })
+    print(f"Queued report delivery {ticket} to {to}")
+
+    if start_worker:
+        start_delivery_worker(outbox_dir)
+
+    return {"ticket": ticket, "status": "queued"}
+
+
+def deliver_ticket(ticket_dir, max_attempts=DELIVERY_MAX_ATTEMPTS, base_delay=DELIVERY_RETRY_BASE_SECONDS):
+    """
+    Try to send one queued email.
+
+    A delivered ticket leaves only its manifest in the ``sent`` directory of the outbox. On failure the
+    next attempt is scheduled with exponential backoff (base_delay * 2 ** (attempts - 1)); after
+    max_attempts the ticket is moved to the ``failed`` directory of the outbox.
+
+    :return: "sent", "retry", "failed" or "waiting" when the next attempt is not due yet
+    """
+    manifest = _read_manifest(ticket_dir)
+    if manifest["next_attempt"] > time.time():
+        return "waiting"
+
+    # the attachment archive is built inside the ticket, so it never lands in a request workspace
+    attachments = [os.path.join(ticket_dir, name) for name in manifest["attachments"]]
+    try:
+        status = send_email(
+            manifest["to"], manifest["subject"], manifest["body"], attachments=attachments, archive_dir=ticket_dir
+        )["status"]
+    except Exception as e:
+        status = f"Failed to send email. Error: {e}"
+
+    if status == SENT_STATUS:
+        manifest["attempts"] += 1
+        manifest["last_status"] = status
+        # record the delivery before removing the ticket, so ticket_status never loses track of it
+        sent_dir = os.path.join(os.path.dirname(ticket_dir), SENT_DIR_NAME, manifest["ticket"])
+        os.makedirs(sent_dir, exist_ok=True)
+        _write_manifest(sent_dir, manifest)
+        shutil.rmtree(ticket_dir)
+        print(f"Delivered report {manifest['ticket']}")
+        return "sent"
+
+    manifest["attempts"] += 1
+    manifest["last_status"] = status
+    if manifest["attempts"] >= max_attempts:
+        _write_manifest(ticket_dir, manifest)
+        failed_dir = os.path.join(os.path.dirname(ticket_dir), FAILED_DIR_NAME)
+        os.makedirs(failed_dir, exist_ok=True)
+        shutil.move(ticket_dir, os.path.join(failed_dir, manifest["ticket"]))
+        print(f"Giving up on report {manifest['ticket']} after {manifest['attempts']} attempts: {status}")
+        return "failed"
+
+    delay = base_delay * 2 ** (manifest["attempts"] - 1)
+    manifest["next_attempt"] = time.time() + delay
+    _write_manifest(ticket_dir, manifest)
+    print(f"Delivery of report {manifest['ticket']} failed ({status}), retrying in {delay}s")
+    return "retry"
+
+
+def pending_tickets(outbox_dir=OUTBOX_DIR):
+    if not os.path.isdir(outbox_dir):
+        return []
+    tickets = []
+    for name in sorted(os.listdir(outbox_dir)):
+        if os.path.exists(os.path.join(outbox_dir, name, MANIFEST_NAME)):
+            tickets.append(name)
+    return tickets
+
+
+def ticket_status(ticket, outbox_dir=OUTBOX_DIR):
+    """
+    Report where a ticket stands.
+
+    :param ticket: Delivery ticket
+    :param outbox_dir: Outbox directory
+    :return: Ticket, status ("queued", "retry", "failed", "sent" or "unknown"), attempts and the last send status
+    """
+    # the sent record is written before the queued ticket is removed, so check it first
+    for status, ticket_dir in (
+        ("sent", os.path.join(outbox_dir, SENT_DIR_NAME, ticket)),
+        ("failed", os.path.join(outbox_dir, FAILED_DIR_NAME, ticket)),
+        (None, os.path.join(outbox_dir, ticket)),
+    ):
+        try:
+            manifest = _read_manifest(ticket_dir)
+        except (OSError, ValueError):
+            continue
+        if status is None:
+            status = "retry" if manifest["attempts"] > 0 else "queued"
+        return {"ticket": ticket, "status": status, "attempts": manifest["attempts"], "last_status": manifest["last_status"]}
+
+    # never queued here, mistyped, or a sent record that was already pruned
+    return {"ticket": ticket, "status": "unknown", "attempts": None, "last_status": None}
+
+
+def wait_for_delivery(ticket, timeout, outbox_dir=OUTBOX_DIR, poll_interval=0.1):
+    """
+    Wait until the first delivery attempt of a ticket finished, or until ``timeout`` expires.
+
+    On Lambda the delivery worker is frozen together with the container once the handler returns;
+    a handler that must report the outcome waits for it here within its remaining time.
+
+    :param ticket: Delivery ticket
+    :param timeout: Maximum number of seconds to wait
+    :param outbox_dir: Outbox directory
+    :param poll_interval: Seconds between two status checks
+    :return: Ticket status, see ticket_status; "queued" when the attempt did not finish in time
+    """
+    deadline = time.monotonic() + max(timeout, 0)
+    while True:
+        status = ticket_status(ticket, outbox_dir)
+        remaining = deadline - time.monotonic()
+        if status["status"] != "queued" or remaining <= 0:
+            return status
+        time.sleep(min(poll_interval, remaining))
+
+
+def prune_sent_tickets(outbox_dir=OUTBOX_DIR, retention=DELIVERY_SENT_RETENTION_SECONDS):
+    """
+    Remove the records of tickets delivered more than ``retention`` seconds ago.
+
+    :param outbox_dir: Outbox directory
+    :param retention: Seconds a sent record is kept
+    :return: Number of removed records
+    """
+    sent_root = os.path.join(outbox_dir, SENT_DIR_NAME)
+    if not os.path.isdir(sent_root):
+        return 0
+
+    removed = 0
+    cutoff = time.time() - retention
+    for name in os.listdir(sent_root):
+        path = os.path.join(sent_root, name)
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def drain_outbox(outbox_dir=OUTBOX_DIR, max_attempts=DELIVERY_MAX_ATTEMPTS, base_delay=DELIVERY_RETRY_BASE_SECONDS):
+    """
+    Make one delivery pass over every ticket in the outbox whose next attempt is due, then prune
+    old sent records.
+
+    :return: Tickets per outcome ("sent", "retry", "failed", "waiting")
+    """
+    summary = {"sent": [], "retry": [], "failed": [], "waiting": []}
+    with _drain_lock:
+        for ticket in pending_tickets(outbox_dir):
+            try:
+                outcome = deliver_ticket(os.path.join(outbox_dir, ticket), max_attempts=max_attempts, base_delay=base_delay)
+            except Exception as e:
+                print(f"Error delivering report {ticket}: {e}")
+                outcome = "retry"
+            summary[outcome].append(ticket)
+        prune_sent_tickets(outbox_dir)
+    return summary
+
+
+def next_attempt_delay(outbox_dir=OUTBOX_DIR):
+    """
+    Seconds until the earliest queued ticket is due, or None when the outbox is empty.
+    """
+    delays = []
+    for ticket in pending_tickets(outbox_dir):
+        try:
+            delays.append(_read_manifest(os.path.join(outbox_dir, ticket))["next_attempt"] - time.time())
+        except (OSError, ValueError):
+            continue
+    return max(min(delays), 0) if delays else None
+
+
+def tickets_due(outbox_dir=OUTBOX_DIR):
+    """
+    Whether any queued ticket is due for a delivery attempt now.
+    """
+    delay = next_attempt_delay(outbox_dir)
+    return delay is not None and delay <= 0
+
+
+def _run_worker(outbox_dir):
+    global _worker
+    while True:
+        drain_outbox(outbox_dir)
+        # exit once nothing is due instead of sleeping through a retry backoff: a live worker keeps
+        # parallel_map from forking, and resume_delivery picks the retries up on the next request.
+        # The check runs under the lock, so a ticket queued meanwhile still finds a live worker.
+        with _worker_lock:
+            if not tickets_due(outbox_dir):
+                _worker = None
+                return
+
+
+def start_delivery_worker(outbox_dir=OUTBOX_DIR):
+    """
+    Start the background thread draining the outbox, unless it is already running.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, args=(outbox_dir,), name="report-delivery", daemon=True)
+            _worker.start()
+        return _worker
+
+
+def resume_delivery(outbox_dir=OUTBOX_DIR):
+    """
+    Restart the delivery worker for tickets whose retry became due while no worker was running.
+
+    :param outbox_dir: Outbox directory
+    :return: The worker thread, or None when no ticket is due
+    """
+    if not tickets_due(outbox_dir):
+        return None
+    return start_delivery_worker(outbox_dir)
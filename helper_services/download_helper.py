@@ -1,28 +1,55 @@
-import atexit
+import hashlib
 import os
-import shutil
 import tempfile
-from urllib.parse import urlparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from common.common_constants import DOWNLOAD_MAX_WORKERS
+from helper_services.zip_cache_helper import get_zip_cache
 
-def download_zip_from_url(url, download_dir):
+
+def zip_filename(url):
+    """
+    Name of the file a URL is downloaded to, unique per URL.
+
+    Download URLs carry the archive name in the ``profiling_link`` query parameter, other URLs in
+    their path. A digest of the full URL keeps URLs with the same archive name apart, so parallel
+    downloads never write to the same file.
+
+    :param url: URL of the ZIP file
+    """
+    parsed_url = urlparse(url)
+    profiling_link = parse_qs(parsed_url.query).get("profiling_link")
+    name = os.path.basename(profiling_link[0] if profiling_link else parsed_url.path)
+    stem = name[:-len('.zip')] if name.endswith('.zip') and len(name) > len('.zip') else "downloaded"
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return f"{stem}_{digest}.zip"
+
+
+def download_zip_from_url(url, download_dir, session=None):
     try:
         print(f"Downloading {url}...")
-        response = requests.get(url, stream=True)
+        http = session if session is not None else requests
+        response = http.get(url, stream=True)
         response.raise_for_status()
         
-        parsed_url = urlparse(url)
-        filename = os.path.basename(parsed_url.path)
-        if not filename or not filename.endswith('.zip'):
-            filename = f"downloaded_{abs(hash(url)) % 10000:04d}.zip"
-        
-        filepath = os.path.join(download_dir, filename)
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        filepath = os.path.join(download_dir, zip_filename(url))
+
+        # write to a private file and move it into place, so a file hardlinked from the ZIP cache
+        # is replaced instead of being truncated and overwritten through the link
+        fd, temp_path = tempfile.mkstemp(dir=download_dir, prefix=".download-", suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            os.remove(temp_path)
+            raise
         
         print(f"Downloaded: {filepath}")
         return filepath
@@ -31,32 +58,110 @@ def download_zip_from_url(url, download_dir):
         print(f"Error downloading {url}: {e}")
 
 
-def fetch_zip_files(zip_urls, download_dir):
+def create_session(max_workers):
+    """
+    Create a requests session whose connection pool can serve every download worker.
+
+    :param max_workers: Number of threads that will share the session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def timed_download(url, download_dir, session=None, cache=None):
+    """
+    Download a single URL and record how long it took and how many bytes were written.
+
+    :param url: URL of the ZIP file
+    :param download_dir: Directory the file is written to
+    :param session: Optional shared requests session
+    :param cache: Optional ZipCache consulted before and filled after the download
+    """
+    start = time.perf_counter()
+    cached = False
+    filepath = None
+
+    if cache is not None:
+        cached_path = os.path.join(download_dir, zip_filename(url))
+        try:
+            cached = cache.fetch(url, cached_path)
+        except Exception as e:
+            print(f"Error reading ZIP cache for {url}: {e}")
+        if cached:
+            filepath = cached_path
+            print(f"Cache hit: {filepath}")
+
+    if not cached:
+        filepath = download_zip_from_url(url, download_dir, session=session)
+        if cache is not None and filepath and os.path.exists(filepath):
+            try:
+                cache.store(url, filepath)
+            except Exception as e:
+                print(f"Error writing ZIP cache for {url}: {e}")
+
+    elapsed = time.perf_counter() - start
+
+    size = os.path.getsize(filepath) if filepath and os.path.exists(filepath) else 0
+
+    return filepath, {"url": url, "path": filepath, "seconds": round(elapsed, 4), "bytes": size, "cached": cached}
+
+
+def fetch_zip_files(zip_urls, download_dir, max_workers=None, stats=None, cache=None):
+    """
+    Download all ZIP files using a bounded thread pool sharing one pooled session.
+
+    :param zip_urls: URLs of the ZIP files
+    :param download_dir: Directory the files are written to
+    :param max_workers: Maximum number of concurrent downloads (defaults to DOWNLOAD_MAX_WORKERS)
+    :param stats: Optional list that receives one timing record per URL, in sorted URL order
+    :param cache: Optional ZipCache used to skip downloads of archives fetched earlier
+    """
     downloaded_files = []
-    
+
     os.makedirs(download_dir, exist_ok=True)
-    atexit.register(lambda: shutil.rmtree(download_dir))
-    
-    for url in sorted(zip_urls):
-        filepath = download_zip_from_url(url, download_dir)
+
+    urls = sorted(zip_urls)
+    if max_workers is None:
+        max_workers = DOWNLOAD_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(urls)))
+
+    start = time.perf_counter()
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda url: timed_download(url, download_dir, session=session, cache=cache), urls))
+    elapsed = time.perf_counter() - start
+
+    total_bytes = 0
+    for filepath, record in results:
         if filepath:
             downloaded_files.append(filepath)
-    
+        total_bytes += record["bytes"]
+        source = "cache" if record["cached"] else "network"
+        print(f"Download stats: {record['url']} {record['bytes']} bytes in {record['seconds']:.3f}s ({source})")
+        if stats is not None:
+            stats.append(record)
+
     downloaded_files.sort()
-     
+
     print(f"Successfully downloaded {len(downloaded_files)}/{len(zip_urls)} files")
+    print(f"Downloaded {total_bytes} bytes in {elapsed:.3f}s using {max_workers} workers")
+    if cache is not None:
+        print(f"ZIP cache stats: {cache.stats()}")
 
     return downloaded_files
 
 
-def download_files(zip_urls):
+def download_files(zip_urls, max_workers=None, use_cache=True):
     if zip_urls:
         print(f"Fetching {len(zip_urls)} ZIP files from URLs...")
         
         download_dir = os.path.join(tempfile.gettempdir(), "causal_analysis_fixed")
         print(f"Download directory: {download_dir}")
         
-        downloaded_files = fetch_zip_files(zip_urls, download_dir)
+        cache = get_zip_cache() if use_cache else None
+        downloaded_files = fetch_zip_files(zip_urls, download_dir, max_workers=max_workers, cache=cache)
 
         return download_dir, downloaded_files
     else:
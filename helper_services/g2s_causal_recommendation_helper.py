@@ -1,11 +1,14 @@
-import itertools
-
 import numpy as np
 import pandas as pd
-from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
-from scipy.spatial import Delaunay
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import Delaunay, cKDTree
+
+from common.common_constants import G2S_SAMPLING_MODE, RANDOM_SEED
+from common.parallel_helper import parallel_map
+
 
-from common.common_constants import RANDOM_SEED
+SAMPLING_MODES = ("batched", "sequential")
+MERGE_CHUNK_ROWS = 1 << 16
 
 
 def _number_subspaces(n_dims):
@@ -134,11 +137,44 @@ def _choose_num_centres(weights, new_budget, cov_t=0.9, alpha=2.0):
     return int(min(int(np.ceil(new_budget / alpha)), k_cov))
 
 
+def _row_dot(a, b):
+    """Dot product along the last axis, evaluated like ``np.dot`` on each row."""
+    return (a[..., None, :] @ b[..., :, None])[..., 0, 0]
+
+
+def _sum_per_vertex(vertex_ids, values, n_points):
+    """Sum values per vertex in incidence order.
+
+    Vertices with the same number of incident simplices are reduced together
+    as rows of one matrix, which gives the same result as ``np.sum`` over each
+    vertex's own list of values.
+
+    Args:
+        vertex_ids (np.ndarray): Vertex index of every value.
+        values (np.ndarray): Values to sum, in incidence order.
+        n_points (int): Number of vertices.
+
+    Returns:
+        np.ndarray: Array of shape ``(n_points,)`` with one sum per vertex.
+    """
+    order = np.argsort(vertex_ids, kind="stable")
+    sorted_values = values[order]
+    counts = np.bincount(vertex_ids, minlength=n_points)
+    starts = np.cumsum(counts) - counts
+
+    sums = np.zeros(n_points, dtype=float)
+    for degree in np.unique(counts[counts > 0]):
+        vertices = np.flatnonzero(counts == degree)
+        sums[vertices] = sorted_values[starts[vertices][:, None] + np.arange(degree)].sum(axis=1)
+    return sums
+
+
 def _solid_angle_triangle(point, va, vb, vc):
     """Compute the solid angle subtended by a triangle at a query point.
 
     This helper intentionally mirrors MATLAB's ``Solid_Angle_Triangle.m``.
-    It is used by the 3D vertex-gradient aggregation routine.
+    It is used by the 3D vertex-gradient aggregation routine. All arguments
+    may also be stacked along leading axes to evaluate many triangles at once.
 
     Args:
         point (np.ndarray): Query point where the solid angle is measured.
@@ -147,18 +183,23 @@ def _solid_angle_triangle(point, va, vb, vc):
         vc (np.ndarray): Third triangle vertex.
 
     Returns:
-        float: Signed solid angle in radians.
+        float | np.ndarray: Signed solid angle in radians, one per stacked
+        triangle.
     """
     r_pa = point - va
     r_pb = point - vb
     r_pc = point - vc
 
-    numerator = float(np.dot(r_pa, np.cross(r_pb, r_pc)))
+    norm_pa = np.sqrt(_row_dot(r_pa, r_pa))
+    norm_pb = np.sqrt(_row_dot(r_pb, r_pb))
+    norm_pc = np.sqrt(_row_dot(r_pc, r_pc))
+
+    numerator = _row_dot(r_pa, np.cross(r_pb, r_pc))
     denominator = (
-        np.linalg.norm(r_pa) * np.linalg.norm(r_pb) * np.linalg.norm(r_pc)
-        + np.dot(r_pa, r_pb) * np.linalg.norm(r_pc)
-        + np.dot(r_pa, r_pc) * np.linalg.norm(r_pb)
-        + np.dot(r_pb, r_pc) * np.linalg.norm(r_pa)
+        norm_pa * norm_pb * norm_pc
+        + _row_dot(r_pa, r_pb) * norm_pc
+        + _row_dot(r_pa, r_pc) * norm_pb
+        + _row_dot(r_pb, r_pc) * norm_pa
     )
     return 2.0 * np.arctan2(numerator, denominator)
 
@@ -191,7 +232,6 @@ def _estimate_gradient(tri, samples, criticality=None):
         values = np.asarray(criticality, dtype=float)
 
     simplices = tri.simplices
-    n_simplices = simplices.shape[0]
 
     if n_dims == 2:
         i = samples[simplices[:, 0], :2]
@@ -211,7 +251,6 @@ def _estimate_gradient(tri, samples, criticality=None):
         jir = ji @ rot.T
         grad = (j_f - i_f)[:, None] * (ikr / (2 * areas[:, None])) + (k_f - i_f)[:, None] * (jir / (2 * areas[:, None]))
     elif n_dims == 3:
-        grad = np.zeros((n_simplices, 3), dtype=float)
         i = samples[simplices[:, 0], :3]
         j = samples[simplices[:, 1], :3]
         k = samples[simplices[:, 2], :3]
@@ -234,71 +273,105 @@ def _estimate_gradient(tri, samples, criticality=None):
         ki_f = k_f - i_f
         hi_f = h_f - i_f
 
-        for t in range(n_simplices):
-            vol = (1.0 / 6.0) * abs(np.linalg.det(np.vstack([ji[t], ki[t], hi[t]])))
-            if vol > 0:
-                grad[t] = (
-                    ji_f[t] * (np.cross(ik[t], hk[t]) / (2 * vol))
-                    + ki_f[t] * (np.cross(ih[t], jh[t]) / (2 * vol))
-                    + hi_f[t] * (np.cross(ki[t], ji[t]) / (2 * vol))
-                )
+        # all simplices at once; degenerate (zero-volume) tetrahedra keep a zero gradient
+        vols = (1.0 / 6.0) * np.abs(np.linalg.det(np.stack([ji, ki, hi], axis=1)))
+        valid = vols > 0
+        twice_vols = np.where(valid, 2 * vols, 1.0)[:, None]
+
+        grad = (
+            ji_f[:, None] * (np.cross(ik, hk) / twice_vols)
+            + ki_f[:, None] * (np.cross(ih, jh) / twice_vols)
+            + hi_f[:, None] * (np.cross(ki, ji) / twice_vols)
+        )
+        grad[~valid] = 0.0
     else:
         raise ValueError("Only 2D and 3D gradients are supported")
 
     n_points = tri.points.shape[0]
-    attachments = [[] for _ in range(n_points)]
-    for tri_id, simplex in enumerate(simplices):
-        for vertex in simplex:
-            attachments[vertex].append(tri_id)
-
-    grad_v = np.zeros((n_points, n_dims), dtype=float)
     points = tri.points
+    n_corners = n_dims + 1
+
+    # one row per (simplex, corner): the corner vertex followed by the other vertices in order
+    others = np.array([[c for c in range(n_corners) if c != corner] for corner in range(n_corners)])
+    corner_ids = simplices.reshape(-1)
+    other_ids = simplices[:, others].reshape(-1, n_dims)
+    p1 = points[corner_ids]
 
     if n_dims == 2:
         i = samples[simplices[:, 0], :2]
         j = samples[simplices[:, 1], :2]
         k = samples[simplices[:, 2], :2]
         areas = 0.5 * np.abs((j[:, 0] - i[:, 0]) * (k[:, 1] - i[:, 1]) - (k[:, 0] - i[:, 0]) * (j[:, 1] - i[:, 1]))
-        for point_idx in range(n_points):
-            tri_ids = attachments[point_idx]
-            if not tri_ids:
-                continue
-
-            angles = []
-            weighted_grad = np.zeros(n_dims)
-            for tri_id in tri_ids:
-                ids = simplices[tri_id].tolist()
-                ids.remove(point_idx)
-                p1, p2, p3 = points[point_idx], points[ids[0]], points[ids[1]]
-                angle = np.arctan2(2 * areas[tri_id], np.dot(p2 - p1, p3 - p1))
-                angles.append(angle)
-                weighted_grad += angle * grad[tri_id]
-
-            grad_v[point_idx] = weighted_grad / max(np.sum(angles), 1e-12)
+        p2, p3 = points[other_ids[:, 0]], points[other_ids[:, 1]]
+        angles = np.arctan2(2 * np.repeat(areas, n_corners), _row_dot(p2 - p1, p3 - p1))
     else:
-        for point_idx in range(n_points):
-            tri_ids = attachments[point_idx]
-            if not tri_ids:
-                continue
-
-            angles = []
-            weighted_grad = np.zeros(n_dims)
-            for tri_id in tri_ids:
-                ids = simplices[tri_id].tolist()
-                ids.remove(point_idx)
-                p1 = points[point_idx]
-                p2, p3, p4 = points[ids[0]], points[ids[1]], points[ids[2]]
-                angle = abs(_solid_angle_triangle(p1, p2, p3, p4))
-                angles.append(angle)
-                weighted_grad += angle * grad[tri_id]
-
-            solid_angle = np.sum(angles)
-            grad_value = weighted_grad / max(solid_angle, 1e-12)
-            grad_v[point_idx] = grad_value / 2.0 if solid_angle < 4 * np.pi else grad_value
+        p2, p3, p4 = points[other_ids[:, 0]], points[other_ids[:, 1]], points[other_ids[:, 2]]
+        angles = np.abs(_solid_angle_triangle(p1, p2, p3, p4))
+
+    angle_sums = _sum_per_vertex(corner_ids, angles, n_points)
+    weighted_grad = np.zeros((n_points, n_dims), dtype=float)
+    np.add.at(weighted_grad, corner_ids, angles[:, None] * np.repeat(grad, n_corners, axis=0))
+
+    grad_v = weighted_grad / np.maximum(angle_sums, 1e-12)[:, None]
+    if n_dims == 3:
+        grad_v[angle_sums < 4 * np.pi] /= 2.0
+
+    attached = np.bincount(corner_ids, minlength=n_points) > 0
+    grad_v[~attached] = 0.0
 
     return grad_v
 
 
+class _SplitGeometry:
+    """Triangulation and nearest-neighbour tree shared by one split.
+
+    The gradient estimate, the proposal interpolation and the candidate
+    scoring of a split all work on the same sample coordinates. Building the
+    Delaunay triangulation once and handing it to every
+    ``LinearNDInterpolator`` avoids re-running Qhull for each of them, and the
+    KD-tree for the nearest-neighbour fallback is only built when a query
+    point falls outside the convex hull.
+
+    Args:
+        points (np.ndarray): Split-local sample coordinates.
+        tri (scipy.spatial.Delaunay | None): Existing triangulation of
+            ``points`` to reuse.
+    """
+
+    def __init__(self, points, tri=None):
+        self.points = points
+        self.tri = Delaunay(points) if tri is None else tri
+        self._tree = None
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(self.points)
+        return self._tree
+
+    def interpolate(self, values, query_points):
+        """Linearly interpolate values at query points, using the nearest
+        sample for points outside the convex hull.
+
+        Args:
+            values (np.ndarray): One value or value vector per sample point.
+            query_points (np.ndarray): Points to interpolate at.
+
+        Returns:
+            np.ndarray: Interpolated values, one row per query point.
+        """
+        interpolated = LinearNDInterpolator(self.tri, values, fill_value=np.nan)(query_points)
+        interpolated = np.asarray(interpolated, dtype=float)
+
+        missing = np.isnan(interpolated)
+        if missing.ndim > 1:
+            missing = missing.any(axis=1)
+        if np.any(missing):
+            _, nearest = self.tree.query(query_points[missing])
+            interpolated[missing] = values[nearest]
+        return interpolated
+
+
 def _prepare_local_dim_weights(dim_weights, n_dims):
     """Validate and normalize split-local causal weights.
 
@@ -326,7 +399,7 @@ def _prepare_local_dim_weights(dim_weights, n_dims):
     return local_dim_weights / np.mean(local_dim_weights)
 
 
-def _propose_samples_new4(samples_tri, values, new_budget, discret_spl, rng, dim_weights=None, causal_mode=0):
+def _propose_samples_new4(samples_tri, values, new_budget, discret_spl, rng, dim_weights=None, causal_mode=0, sampling_mode=G2S_SAMPLING_MODE, geometry=None):
     """Generate new 2D/3D candidate points from weighted local anchors.
 
     This helper intentionally mirrors MATLAB's ``propose_samples_NEW4.m``,
@@ -349,6 +422,15 @@ def _propose_samples_new4(samples_tri, values, new_budget, discret_spl, rng, dim
         causal_mode (int): ``0`` enables weighted norms and anisotropic
             proposals, ``1`` proposal-only weighting, and ``2`` norm-only
             weighting.
+        sampling_mode (str): ``"batched"`` draws the proposals for the whole
+            budget in a few vectorized calls, ``"sequential"`` draws them one
+            candidate at a time in the original order. Both are reproducible
+            for a fixed generator state, but they consume the random stream
+            differently and therefore yield different proposals; use
+            ``"sequential"`` to reproduce recommendations made before the
+            batched sampler existed.
+        geometry (_SplitGeometry | None): Shared triangulation of
+            ``samples_tri``; built on demand when omitted.
 
     Returns:
         tuple[np.ndarray, np.ndarray]: ``x_new`` contains the proposed points,
@@ -364,6 +446,8 @@ def _propose_samples_new4(samples_tri, values, new_budget, discret_spl, rng, dim
         raise ValueError("Sampler is designed for 2D/3D subspaces")
     if causal_mode not in (0, 1, 2):
         raise ValueError("causal_mode must be 0 (both), 1 (proposal), or 2 (norm)")
+    if sampling_mode not in SAMPLING_MODES:
+        raise ValueError(f"sampling_mode must be one of {SAMPLING_MODES}")
 
     lower_bounds = np.array([values_arr[0] for values_arr in discret_spl], dtype=float)
     upper_bounds = np.array([values_arr[-1] for values_arr in discret_spl], dtype=float)
@@ -406,22 +490,31 @@ def _propose_samples_new4(samples_tri, values, new_budget, discret_spl, rng, dim
 
     proposal_scale = local_dim_weights if apply_anisotropic_proposal else np.ones(n_dims, dtype=float)
 
-    x_new = np.zeros((new_budget, n_dims), dtype=float)
-    for i in range(new_budget):
-        if rng.random() < t_mix:
-            center_idx = rng.choice(len(center_weights), p=center_weights)
-            x_candidate = centers[center_idx] + sigma * proposal_scale * rng.normal(size=n_dims)
-            x_candidate = np.clip(x_candidate, 0.0, 1.0)
-        else:
-            x_candidate = rng.random(size=n_dims)
-        x_new[i] = lower_bounds + x_candidate * (upper_bounds - lower_bounds)
+    if sampling_mode == "sequential":
+        x_new = np.zeros((new_budget, n_dims), dtype=float)
+        for i in range(new_budget):
+            if rng.random() < t_mix:
+                center_idx = rng.choice(len(center_weights), p=center_weights)
+                x_candidate = centers[center_idx] + sigma * proposal_scale * rng.normal(size=n_dims)
+                x_candidate = np.clip(x_candidate, 0.0, 1.0)
+            else:
+                x_candidate = rng.random(size=n_dims)
+            x_new[i] = lower_bounds + x_candidate * (upper_bounds - lower_bounds)
+    else:
+        # draw mixture indicators, centres and perturbations for the whole budget at once
+        from_centres = rng.random(new_budget) < t_mix
+        n_from_centres = int(np.count_nonzero(from_centres))
+        center_idx = rng.choice(len(center_weights), size=n_from_centres, p=center_weights)
+        perturbations = rng.normal(size=(n_from_centres, n_dims))
 
-    linear_interp = LinearNDInterpolator(samples_tri, values, fill_value=np.nan)
-    vhat = linear_interp(x_new)
-    missing = np.isnan(vhat)
-    if np.any(missing):
-        nearest_interp = NearestNDInterpolator(samples_tri, values)
-        vhat[missing] = nearest_interp(x_new[missing])
+        x_candidates = np.empty((new_budget, n_dims), dtype=float)
+        x_candidates[from_centres] = np.clip(centers[center_idx] + sigma * proposal_scale * perturbations, 0.0, 1.0)
+        x_candidates[~from_centres] = rng.random(size=(new_budget - n_from_centres, n_dims))
+        x_new = lower_bounds + x_candidates * (upper_bounds - lower_bounds)
+
+    if geometry is None:
+        geometry = _SplitGeometry(samples_tri)
+    vhat = geometry.interpolate(values, x_new)
 
     x_new_val = np.column_stack([x_new, vhat.reshape(-1)])
     return x_new, x_new_val
@@ -544,7 +637,7 @@ def _score_1d_gradient_candidates(samples_tri, values, candidate_points):
     return slopes[interval_ids]
 
 
-def _score_gradient_candidates(samples_tri, gradients, candidate_points, dim_weights=None, causal_mode=0):
+def _score_gradient_candidates(samples_tri, gradients, candidate_points, dim_weights=None, causal_mode=0, geometry=None):
     """Score 2D/3D candidates by interpolated gradient magnitude.
 
     This helper does not have a same-named MATLAB equivalent, but it follows
@@ -561,6 +654,8 @@ def _score_gradient_candidates(samples_tri, gradients, candidate_points, dim_wei
         causal_mode (int): ``0`` enables weighted norms and anisotropic
             proposals, ``1`` proposal-only weighting, and ``2`` norm-only
             weighting.
+        geometry (_SplitGeometry | None): Shared triangulation of
+            ``samples_tri``; built on demand when omitted.
 
     Returns:
         np.ndarray: One scalar gradient-magnitude score per candidate.
@@ -571,24 +666,18 @@ def _score_gradient_candidates(samples_tri, gradients, candidate_points, dim_wei
     local_dim_weights = _prepare_local_dim_weights(dim_weights, gradients.shape[1])
     apply_weighted_norm = local_dim_weights is not None and causal_mode in (0, 2)
 
-    linear_interp = LinearNDInterpolator(samples_tri, gradients, fill_value=np.nan)
-    grad_values = linear_interp(candidate_points)
-
-    grad_values = np.asarray(grad_values, dtype=float)
+    if geometry is None:
+        geometry = _SplitGeometry(samples_tri)
+    grad_values = geometry.interpolate(gradients, candidate_points)
     if grad_values.ndim == 1:
         grad_values = grad_values.reshape(-1, gradients.shape[1])
 
-    missing = np.isnan(grad_values).any(axis=1)
-    if np.any(missing):
-        nearest_interp = NearestNDInterpolator(samples_tri, gradients)
-        grad_values[missing] = nearest_interp(candidate_points[missing])
-
     if apply_weighted_norm:
         return np.sqrt(np.sum((grad_values * local_dim_weights) ** 2, axis=1))
     return np.linalg.norm(grad_values, axis=1)
 
 
-def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_output, rng, causal_weights=None, causal_mode=0):
+def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_output, rng, causal_weights=None, causal_mode=0, sampling_mode=G2S_SAMPLING_MODE):
     """Run the fork's simplified gradient-based strategy for one subspace.
 
     This helper intentionally mirrors MATLAB's ``execute_strategy.m`` in name
@@ -613,6 +702,8 @@ def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_outp
         causal_mode (int): ``0`` enables weighted norms and anisotropic
             proposals, ``1`` proposal-only weighting, and ``2`` norm-only
             weighting.
+        sampling_mode (str): Proposal sampling mode passed to
+            ``_propose_samples_new4``.
 
     Returns:
         tuple[np.ndarray, np.ndarray]: Proposed split-local samples and their
@@ -642,8 +733,8 @@ def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_outp
         return np.zeros((0, ndim_spl), dtype=float), np.zeros(0, dtype=float)
 
     try:
-        tri = Delaunay(samples_tri)
-        gradients = _estimate_gradient(tri, np.column_stack([samples_tri[:, :ndim_spl], averaged_values]))
+        geometry = _SplitGeometry(samples_tri)
+        gradients = _estimate_gradient(geometry.tri, np.column_stack([samples_tri[:, :ndim_spl], averaged_values]))
         samples_tri_prop, _ = _propose_samples_new4(
             samples_tri=samples_tri,
             values=gradients,
@@ -652,6 +743,8 @@ def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_outp
             rng=rng,
             dim_weights=local_dim_weights,
             causal_mode=causal_mode,
+            sampling_mode=sampling_mode,
+            geometry=geometry,
         )
         scores = _score_gradient_candidates(
             samples_tri=samples_tri,
@@ -659,6 +752,7 @@ def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_outp
             candidate_points=samples_tri_prop,
             dim_weights=local_dim_weights,
             causal_mode=causal_mode,
+            geometry=geometry,
         )
         return samples_tri_prop, scores
     except Exception as e:
@@ -666,51 +760,129 @@ def _execute_strategy_1(ndim_spl, discret_spl, total_budget, split, samples_outp
         return np.zeros((0, ndim_spl), dtype=float), np.zeros(0, dtype=float)
 
 
-def _merge_subspace_samples(split_samples, split_scores, splits, n_dims, taken_keys):
+def _match_rows(rows, query):
+    """Return the position of every ``query`` row in the unique ``rows``.
+
+    Args:
+        rows (np.ndarray): Distinct rows to look up.
+        query (np.ndarray): Rows to find, with the same number of columns.
+
+    Returns:
+        np.ndarray: Row position for each query row, ``-1`` when absent.
+    """
+    _, inverse = np.unique(np.vstack([rows, query]), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    positions = np.full(inverse.max() + 1, -1, dtype=np.int64)
+    positions[inverse[: rows.shape[0]]] = np.arange(rows.shape[0])
+    return positions[inverse[rows.shape[0]:]]
+
+
+def _select_top(points, scores, k=None):
+    """Select the best ``k`` candidates in rank order.
+
+    Candidates are ranked by descending score rounded to 8 decimals, ties by
+    ascending coordinates. ``np.argpartition`` first narrows the rows down to
+    those scoring at least the ``k``-th best score, so only the selection and
+    its ties are fully sorted.
+
+    Args:
+        points (np.ndarray): Candidate points, one per row.
+        scores (np.ndarray): Score of each candidate.
+        k (int | None): Number of candidates to keep; all when omitted.
+
+    Returns:
+        np.ndarray: Row indices of the selected candidates, best first.
+    """
+    rank_scores = -np.round(scores, 8)
+    selected = np.arange(len(scores))
+    if k is not None and k < len(scores):
+        cutoff = rank_scores[np.argpartition(rank_scores, k - 1)[k - 1]]
+        selected = np.flatnonzero(~(rank_scores > cutoff))
+
+    sort_keys = [points[selected, idx] for idx in reversed(range(points.shape[1]))]
+    order = selected[np.lexsort(sort_keys + [rank_scores[selected]])]
+    return order if k is None else order[:k]
+
+
+def _merge_subspace_samples(split_samples, split_scores, splits, n_dims, existing_points=None, max_candidates=None):
     """Combine one proposal from each split into full-dimensional candidates.
 
     This helper has no direct MATLAB equivalent with the same name; it is part
     of the simplified lifting logic used by this fork to turn split-local
     proposals into full-space recommendations.
 
+    Duplicate proposals are collapsed per split first, keeping their best
+    score. Because the merged score is the sum of the split scores, the best
+    combination of split rows is the best score of the resulting point. Each
+    combination is identified by the mixed-radix integer built from its split
+    row ids, so the Cartesian product is walked in chunks of index arrays,
+    existing points are removed by integer key, and only the best
+    ``max_candidates`` rows are kept between chunks.
+
     Args:
-        split_samples (list[np.ndarray]): Proposed samples for each split.
+        split_samples (list[np.ndarray]): Proposed samples for each split,
+            already snapped to the hyperparameter domain.
         split_scores (list[np.ndarray]): Scalar scores corresponding to
             ``split_samples``.
         splits (list[list[int]]): 0-based split definitions.
         n_dims (int): Full-space dimensionality.
-        taken_keys (set[str]): Serialized points that should not be emitted
-            again.
+        existing_points (np.ndarray | None): Observed full-space points that
+            should not be emitted again.
+        max_candidates (int | None): Number of best candidates to keep; all
+            candidates are returned when omitted.
 
     Returns:
-        tuple[np.ndarray, np.ndarray, set[str]]: Merged full-space candidates,
-        merged scores, and the updated ``taken_keys`` set.
+        tuple[np.ndarray, np.ndarray]: Distinct full-space candidates and
+        their scores, ordered by descending score and ascending coordinates.
     """
+    empty = np.zeros((0, n_dims), dtype=float), np.zeros(0, dtype=float)
     if any(sample is None or sample.size == 0 for sample in split_samples):
-        return np.zeros((0, n_dims), dtype=float), np.zeros(0, dtype=float), taken_keys
-
-    merged_rows = []
-    merged_scores = []
-    split_entries = [list(zip(samples, scores)) for samples, scores in zip(split_samples, split_scores)]
-    for row_group in itertools.product(*split_entries):
-        x_full = np.zeros(n_dims, dtype=float)
-        total_score = 0.0
-        for split_idx, split in enumerate(splits):
-            sample_values, score = row_group[split_idx]
-            x_full[np.array(split)] = sample_values
-            total_score += float(score)
-
-        key = "_".join([f"{value:.12g}" for value in x_full])
-        if key in taken_keys:
+        return empty
+
+    split_rows = []
+    split_best = []
+    for samples, scores in zip(split_samples, split_scores):
+        rows, inverse = np.unique(np.asarray(samples, dtype=float), axis=0, return_inverse=True)
+        best = np.full(rows.shape[0], np.nan)
+        np.fmax.at(best, inverse.reshape(-1), np.asarray(scores, dtype=float))
+        split_rows.append(rows)
+        split_best.append(best)
+
+    sizes = [rows.shape[0] for rows in split_rows]
+    n_combinations = int(np.prod(sizes))
+
+    excluded = np.zeros(0, dtype=np.int64)
+    if existing_points is not None and len(existing_points) > 0:
+        existing_points = np.asarray(existing_points, dtype=float)
+        existing_ids = [_match_rows(rows, existing_points[:, split]) for rows, split in zip(split_rows, splits)]
+        matched = np.all([ids >= 0 for ids in existing_ids], axis=0)
+        if np.any(matched):
+            excluded = np.ravel_multi_index([ids[matched] for ids in existing_ids], sizes)
+
+    best_points, best_scores = empty
+    for start in range(0, n_combinations, MERGE_CHUNK_ROWS):
+        keys = np.arange(start, min(start + MERGE_CHUNK_ROWS, n_combinations), dtype=np.int64)
+        keys = keys[~np.isin(keys, excluded)]
+        if keys.size == 0:
             continue
 
-        taken_keys.add(key)
-        merged_rows.append(x_full)
-        merged_scores.append(total_score)
+        points = np.empty((keys.size, n_dims), dtype=float)
+        scores = np.zeros(keys.size, dtype=float)
+        for split, rows, best, ids in zip(splits, split_rows, split_best, np.unravel_index(keys, sizes)):
+            points[:, split] = rows[ids]
+            scores = scores + best[ids]
+
+        if max_candidates is not None and best_scores.size >= max_candidates:
+            # rows scoring below the current cut-off can never enter the top candidates
+            keep = np.round(scores, 8) >= np.round(best_scores[-1], 8)
+            points, scores = points[keep], scores[keep]
+
+        points = np.vstack([best_points, points])
+        scores = np.concatenate([best_scores, scores])
+        order = _select_top(points, scores, max_candidates)
+        best_points, best_scores = points[order], scores[order]
 
-    if not merged_rows:
-        return np.zeros((0, n_dims), dtype=float), np.zeros(0, dtype=float), taken_keys
-    return np.vstack(merged_rows), np.asarray(merged_scores, dtype=float), taken_keys
+    return best_points, best_scores
 
 
 def _snap_to_domain(values, dim_name, dim_config, hp_dtypes):
@@ -741,7 +913,7 @@ def _snap_to_domain(values, dim_name, dim_config, hp_dtypes):
     return clipped.astype(float)
 
 
-def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_points, causal_mode=0, random_seed=RANDOM_SEED):
+def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_points, causal_mode=0, random_seed=RANDOM_SEED, sampling_mode=None, max_workers=None):
     """
     Generate causal recommendations with a stripped-down G2S-inspired sampler.
 
@@ -757,10 +929,19 @@ def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_point
         max_points (int): Maximum recommendation budget.
         causal_mode (int): 0 = weighted norm and anisotropic proposal, 1 = proposal only, 2 = norm only.
         random_seed (int): Random seed for reproducibility.
+        sampling_mode (str): "batched" or "sequential" proposal sampling, defaults to G2S_SAMPLING_MODE.
+            A fixed random_seed gives stable recommendations in either mode; "sequential" reproduces
+            the recommendations of the original one-candidate-at-a-time sampler.
+            In "batched" mode every split draws from its own generator spawned from random_seed, so
+            the splits run concurrently and the result does not depend on scheduling.
+        max_workers (int): Maximum number of threads running splits concurrently.
 
     Returns:
         list[tuple]: Recommended points with trailing estimated gradient score.
     """
+    if sampling_mode is None:
+        sampling_mode = G2S_SAMPLING_MODE
+
     if not dimensions or max_points <= 0:
         return []
 
@@ -778,7 +959,6 @@ def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_point
     if working_df.empty:
         return []
 
-    rng = np.random.default_rng(random_seed)
     causal_weights = np.array([max(abs(dimensions[name]["strength"]), 1e-6) for name in dim_names], dtype=float)
 
     discret = []
@@ -792,13 +972,10 @@ def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_point
     splits = _create_subspaces(len(dim_names))
     ndims_run, discrets_run, dims_left_run = _initialize_splits(splits, discret)
 
-    taken = {"_".join([f"{value:.12g}" for value in row]) for row in existing_points}
-
     n_subspaces = max(len(splits), 1)
     subspace_budget = max(1, int(np.ceil(max_points ** (1.0 / n_subspaces))))
 
-    proposed_by_split = [None for _ in splits]
-    score_by_split = [None for _ in splits]
+    split_tasks = []
     for i in range(len(splits)):
         split, ndim_spl, discret_spl, _ = _get_split_information(
             splits,
@@ -807,56 +984,69 @@ def run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_point
             dims_left_run,
             i,
         )
-        proposed_by_split[i], score_by_split[i] = _execute_strategy_1(
+        split_tasks.append(dict(
             ndim_spl=ndim_spl,
             discret_spl=discret_spl,
             total_budget=subspace_budget,
             split=split,
             samples_output=samples_output,
-            rng=rng,
             causal_weights=causal_weights,
             causal_mode=causal_mode,
+            sampling_mode=sampling_mode,
+        ))
+
+    if sampling_mode == "sequential":
+        # the original draw order shares one generator across the splits, in split order
+        rng = np.random.default_rng(random_seed)
+        split_results = [_execute_strategy_1(rng=rng, **task) for task in split_tasks]
+    else:
+        # independent splits run concurrently, each with its own stream derived from the seed
+        split_rngs = [np.random.default_rng(seed) for seed in np.random.SeedSequence(random_seed).spawn(len(split_tasks))]
+        outcomes = parallel_map(
+            lambda item: _execute_strategy_1(rng=item[1], **item[0]),
+            zip(split_tasks, split_rngs),
+            max_workers=max_workers,
+            use_processes=False,
         )
+        for _, error in outcomes:
+            if error is not None:
+                raise error
+        split_results = [result for result, _ in outcomes]
+
+    proposed_by_split = [proposed for proposed, _ in split_results]
+    score_by_split = [scores for _, scores in split_results]
 
-    merged_points, merged_scores, _ = _merge_subspace_samples(
+    # snap every split before merging, so equal points collapse within their split
+    for i, split in enumerate(splits):
+        if proposed_by_split[i] is None or proposed_by_split[i].size == 0:
+            continue
+        snapped_columns = []
+        for col, dim_idx in enumerate(split):
+            dim_name = dim_names[dim_idx]
+            snapped_columns.append(_snap_to_domain(proposed_by_split[i][:, col], dim_name, dimensions[dim_name], hp_dtypes))
+        proposed_by_split[i] = np.column_stack(snapped_columns).astype(float)
+
+    candidate_points, merged_scores = _merge_subspace_samples(
         proposed_by_split,
         score_by_split,
         splits,
         len(dim_names),
-        taken,
+        existing_points=existing_points,
+        max_candidates=max_points,
     )
-    if merged_points.size == 0:
-        return []
-
-    snapped_columns = []
-    for idx, dim_name in enumerate(dim_names):
-        snapped_columns.append(_snap_to_domain(merged_points[:, idx], dim_name, dimensions[dim_name], hp_dtypes))
-    candidate_points = np.column_stack(snapped_columns)
-
-    existing_df = pd.DataFrame(existing_points, columns=dim_names)
-    candidate_df = pd.DataFrame(candidate_points, columns=dim_names).drop_duplicates().reset_index(drop=True)
-    candidate_df = candidate_df.merge(existing_df.drop_duplicates(), on=dim_names, how="left", indicator=True)
-    candidate_df = candidate_df[candidate_df["_merge"] == "left_only"].drop(columns=["_merge"]).reset_index(drop=True)
-    if candidate_df.empty:
+    if candidate_points.size == 0:
         return []
 
-    score_df = pd.DataFrame(candidate_points, columns=dim_names)
-    score_df["gradient_score"] = merged_scores
-    score_df = score_df.groupby(dim_names, as_index=False)["gradient_score"].max()
-    candidate_df = candidate_df.merge(score_df, on=dim_names, how="left")
-
-    candidate_points = candidate_df.to_numpy(dtype=float)
-
+    # only the selected rows are converted to the tuples consumed by the report
+    integer_dims = [hp_dtypes.get(dim_name) == "integer" for dim_name in dim_names]
     ranked = []
-    for row in candidate_df.itertuples(index=False):
+    for point, score in zip(candidate_points.tolist(), merged_scores.tolist()):
         values = []
-        for dim_name in dim_names:
-            point_value = getattr(row, dim_name)
-            if hp_dtypes.get(dim_name) == "integer":
+        for point_value, is_integer in zip(point, integer_dims):
+            if is_integer:
                 values.append(int(round(point_value)))
             else:
-                values.append(round(float(point_value), 8))
-        ranked.append(tuple(values + [round(float(row.gradient_score), 8)]))
+                values.append(round(point_value, 8))
+        ranked.append(tuple(values + [round(score, 8)]))
 
-    ranked = sorted(ranked, key=lambda row: (-row[-1], row[:-1]))
-    return ranked[:max_points]
+    return ranked
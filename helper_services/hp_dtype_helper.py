@@ -1,14 +1,17 @@
-import os
-from causalbench.modules import Run, Model
+from causalbench.modules import Model
 
 
-def process_run(zip_file, hp_dtype, model_cache):
-    # Get run
-    run: Run = Run(zip_file=zip_file)
+def collect_model_hp_dtypes(model_keys, hp_dtype, model_cache):
+    """
+    Record the data type of every hyperparameter of the given models
 
-    for result in run.results:
+    :param model_keys: Iterable of (model id, model version) pairs
+    :param hp_dtype: Dictionary updated in place with hyperparameter name -> data type
+    :param model_cache: Dictionary caching fetched models by (id, version)
+    """
+    for model_key in model_keys:
         # Get and cache model
-        model_key = (result.model.id, result.model.version)
+        model_key = tuple(model_key)
         if not model_key in model_cache:
             model_cache[model_key] = Model(*model_key)
         model = model_cache[model_key]
@@ -18,20 +21,3 @@ def process_run(zip_file, hp_dtype, model_cache):
 
     return hp_dtype
 
-
-def get_hp_dtypes(zip_dir):
-    """
-    Get data types for hyperparamters
-    
-    :param zip_dir: Description
-    """
-    hp_dtype = dict()
-    model_cache = dict()
-
-    # Loop over each .zip file in the specified directory
-    for filename in os.listdir(zip_dir):
-        if filename.endswith('.zip'):
-            zip_file_path = os.path.join(zip_dir, filename)
-            process_run(zip_file_path, hp_dtype, model_cache)
-    
-    return hp_dtype
@@ -1,29 +1,328 @@
+import base64
 import os
+import re
 import smtplib
+import tempfile
+import threading
 import time
+import uuid
+import zipfile
+from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
+from email.policy import compat32
 import common.common_constants as common_constants
 
 
-def start_smtp_connection(email, password):
-    global smtp_connection
-    start = time.time()
-    smtp_connection = smtplib.SMTP('smtp.gmail.com', 587)
-    print(f"SMTP connection started: {str(time.time() - start)}")
-    smtp_connection.starttls()
-    print(f"TLS started: {str(time.time() - start)}")
-    smtp_connection.login(email, password)
-    print(f"Logged in: {str(time.time() - start)}")
-    print("SMTP connection established.")
-    print(smtp_connection)
-    return smtp_connection
+ATTACHMENT_ARCHIVE_NAME = "causal_analysis_attachments.zip"
+SMTP_POLICY = compat32.clone(linesep="\r\n")
 
+MAIL_DROP_DIR = os.environ.get("CAUSALBENCH_MAIL_DROP_DIR", os.path.join(common_constants.CONTAINER_TMP_DIR, "causalbench_mail_drop"))
 
-def send_email(to: str, subject: str, body: str, attachments: list = None):
-    server = start_smtp_connection(common_constants.EMAIL, common_constants.EMAIL_PASSWORD)
+
+class SMTPTransport:
+    """
+    SMTP connection kept alive across sends, and across warm Lambda invocations.
+
+    Before every send the connection is checked with NOOP and re-established when the server dropped
+    it. Every socket operation is bounded by ``timeout``: after Lambda froze the container the kept
+    connection can be half-open, and a NOOP or DATA on it would otherwise block forever while
+    holding the transport lock. STARTTLS and login are skipped when disabled or when no password is
+    configured, so a local stand-in server can be used offline.
+    """
+
+    def __init__(self, host=None, port=None, email=None, password=None, use_tls=True, timeout=None):
+        self.host = host or common_constants.SMTP_HOST
+        self.port = int(port or common_constants.SMTP_PORT)
+        self.timeout = float(timeout or common_constants.SMTP_TIMEOUT_SECONDS)
+        self.email = email or common_constants.EMAIL
+        self.password = common_constants.EMAIL_PASSWORD if password is None else password
+        self.use_tls = use_tls
+        self.connection = None
+        self.counters = {"connects": 0, "sends": 0, "last_send_seconds": None}
+        self._lock = threading.Lock()
+
+    def connect(self):
+        start = time.perf_counter()
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                connection.starttls()
+            if self.password:
+                connection.login(self.email, self.password)
+        except Exception:
+            connection.close()
+            raise
+        self.connection = connection
+        self.counters["connects"] += 1
+        print(f"SMTP connection to {self.host}:{self.port} established in {time.perf_counter() - start:.3f}s")
+
+    def is_alive(self):
+        if self.connection is None:
+            return False
+        try:
+            return self.connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            # includes socket timeouts, so a half-open connection is replaced by ensure_connection
+            return False
+
+    def ensure_connection(self):
+        if not self.is_alive():
+            self.close()
+            self.connect()
+        return self.connection
+
+    def send(self, from_addr, to_addrs, build_blocks):
+        """
+        Send one message, reconnecting once if the server dropped the connection before the data was sent.
+
+        :param from_addr: Envelope sender
+        :param to_addrs: Envelope recipient or list of recipients
+        :param build_blocks: Callable returning a fresh iterable of message blocks
+        """
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                refused = stream_sendmail(self.ensure_connection(), from_addr, to_addrs, build_blocks())
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                refused = stream_sendmail(self.ensure_connection(), from_addr, to_addrs, build_blocks())
+            except (smtplib.SMTPException, OSError):
+                # a timeout mid-conversation leaves the connection in an unknown state
+                self.close()
+                raise
+            self.counters["sends"] += 1
+            self.counters["last_send_seconds"] = round(time.perf_counter() - start, 4)
+            return refused
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            finally:
+                self.connection = None
+
+    def quit(self):
+        with self._lock:
+            if self.connection is not None:
+                try:
+                    self.connection.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self.close()
+
+
+class FileDropTransport:
+    """
+    Writes every message as an .eml file instead of sending it, for tests and offline runs.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or MAIL_DROP_DIR
+        self.counters = {"sends": 0, "last_send_seconds": None}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def send(self, from_addr, to_addrs, build_blocks):
+        start = time.perf_counter()
+        path = os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex}.eml")
+        with open(path, "wb") as file:
+            for block in build_blocks():
+                file.write(block)
+        self.counters["sends"] += 1
+        self.counters["last_send_seconds"] = round(time.perf_counter() - start, 4)
+        print(f"Email written to {path}")
+        return {}
+
+    def quit(self):
+        pass
+
+
+def create_transport(backend=None):
+    """
+    Create the mail transport selected by MAIL_TRANSPORT ("smtp" or "file").
+
+    The SMTP backend reads SMTP_HOST, SMTP_PORT, SMTP_TIMEOUT_SECONDS and SMTP_STARTTLS ("0" disables STARTTLS) from the
+    environment, the file backend writes to MAIL_DROP_DIR (CAUSALBENCH_MAIL_DROP_DIR).
+
+    :param backend: Transport name overriding the environment
+    """
+    backend = backend or os.environ.get("MAIL_TRANSPORT", common_constants.MAIL_TRANSPORT)
+    if backend == "smtp":
+        return SMTPTransport(
+            host=os.environ.get("SMTP_HOST"),
+            port=os.environ.get("SMTP_PORT"),
+            timeout=os.environ.get("SMTP_TIMEOUT_SECONDS"),
+            use_tls=os.environ.get("SMTP_STARTTLS", "1") != "0",
+        )
+    if backend == "file":
+        return FileDropTransport()
+    raise ValueError(f"Unknown mail transport: {backend}")
+
+
+_transport = None
+
+
+def get_transport():
+    """
+    Return the container-wide mail transport, creating it on first use.
+    """
+    global _transport
+    if _transport is None:
+        _transport = create_transport()
+    return _transport
+
+
+def pack_attachments(attachments, zip_threshold=None, max_bytes=None, archive_dir=None):
+    """
+    Compress large attachments into one zip archive and enforce the total size cap.
+
+    :param attachments: Paths of the files to attach
+    :param zip_threshold: Files larger than this many bytes go into the archive (defaults to EMAIL_ZIP_THRESHOLD_BYTES)
+    :param max_bytes: Maximum total size of the attached files (defaults to EMAIL_ATTACHMENT_MAX_BYTES)
+    :param archive_dir: Directory the archive is written to (defaults to the temporary directory)
+    :return: Paths to attach and names of the files omitted because of the size cap
+    """
+    if zip_threshold is None:
+        zip_threshold = common_constants.EMAIL_ZIP_THRESHOLD_BYTES
+    if max_bytes is None:
+        max_bytes = common_constants.EMAIL_ATTACHMENT_MAX_BYTES
+
+    small_files = []
+    large_files = []
+    for attachment in attachments:
+        if os.path.getsize(attachment) > zip_threshold:
+            large_files.append(attachment)
+        else:
+            small_files.append(attachment)
+
+    candidates = [(attachment, [os.path.basename(attachment)]) for attachment in small_files]
+    if large_files:
+        archive_path = os.path.join(archive_dir or tempfile.gettempdir(), ATTACHMENT_ARCHIVE_NAME)
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for attachment in large_files:
+                archive.write(attachment, arcname=os.path.basename(attachment))
+        print(f"Compressed {len(large_files)} attachments into {archive_path} ({os.path.getsize(archive_path)} bytes)")
+        candidates.append((archive_path, [os.path.basename(attachment) for attachment in large_files]))
+
+    packed = []
+    omitted = []
+    total_bytes = 0
+    for candidate, names in candidates:
+        size = os.path.getsize(candidate)
+        if total_bytes + size > max_bytes:
+            omitted.extend(names)
+            print(f"Omitting attachment {candidate}: {size} bytes exceed the remaining size limit")
+            continue
+        packed.append(candidate)
+        total_bytes += size
+
+    return packed, omitted
+
+
+def iter_message(headers, body, attachments, chunk_size=None):
+    """
+    Serialize a multipart message as CRLF-terminated byte blocks without holding it in memory.
+
+    Attachments are read and base64-encoded chunk by chunk while the message is consumed.
+
+    :param headers: MIMEMultipart carrying the top-level headers
+    :param body: Plain-text body
+    :param attachments: Paths of the files to attach
+    :param chunk_size: Bytes read from an attachment at a time, a multiple of 57 (defaults to EMAIL_STREAM_CHUNK_BYTES)
+    """
+    if chunk_size is None:
+        chunk_size = common_constants.EMAIL_STREAM_CHUNK_BYTES
+
+    boundary = f"==============={uuid.uuid4().hex}=="
+    headers.set_boundary(boundary)
+    delimiter = f"--{boundary}\r\n".encode()
+
+    yield b"".join(SMTP_POLICY.fold_binary(name, value) for name, value in headers.items()) + b"\r\n"
+
+    yield delimiter
+    yield MIMEText(body, "plain").as_bytes(policy=SMTP_POLICY) + b"\r\n"
+
+    for attachment in attachments:
+        part = MIMEBase("application", "octet-stream")
+        part.add_header("Content-Transfer-Encoding", "base64")
+        part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(attachment)}")
+
+        yield delimiter
+        yield b"".join(SMTP_POLICY.fold_binary(name, value) for name, value in part.items()) + b"\r\n"
+        with open(attachment, "rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                yield base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+    yield f"--{boundary}--\r\n".encode()
+
+
+def stream_sendmail(server, from_addr, to_addrs, blocks):
+    """
+    Send a message given as CRLF-terminated byte blocks over an open SMTP connection.
+
+    This mirrors smtplib.SMTP.sendmail, but writes the DATA section block by block (with dot-stuffing)
+    instead of requiring the whole message as one string.
+
+    :param server: Connected smtplib.SMTP instance
+    :param from_addr: Envelope sender
+    :param to_addrs: Envelope recipient or list of recipients
+    :param blocks: Iterable of message blocks, each ending with CRLF
+    """
+    if isinstance(to_addrs, str):
+        to_addrs = [to_addrs]
+
+    server.ehlo_or_helo_if_needed()
+
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        server._rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+    refused = {}
+    for to_addr in to_addrs:
+        code, resp = server.rcpt(to_addr)
+        if code not in (250, 251):
+            refused[to_addr] = (code, resp)
+    if len(refused) == len(to_addrs):
+        server._rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    server.putcmd("data")
+    code, resp = server.getreply()
+    if code != 354:
+        server._rset()
+        raise smtplib.SMTPDataError(code, resp)
+
+    for block in blocks:
+        server.send(re.sub(rb"(?m)^\.", b"..", block))
+    server.send(b".\r\n")
+
+    code, resp = server.getreply()
+    if code != 250:
+        server._rset()
+        raise smtplib.SMTPDataError(code, resp)
+
+    return refused
+
+
+def send_email(to: str, subject: str, body: str, attachments: list = None, max_attachment_bytes: int = None, archive_dir: str = None):
+    # pack the attachments first, so a missing file fails before connecting
+    omitted = []
+    if attachments:
+        try:
+            attachments, omitted = pack_attachments(attachments, max_bytes=max_attachment_bytes, archive_dir=archive_dir)
+        except Exception as e:
+            print(f"Failed to attach files {attachments}. Error: {e}")
+            return {"status": f"Failed to attach files {attachments}. Error: {e}"}
+    else:
+        attachments = []
+
+    if omitted:
+        body += (
+            "\n\nThe following attachments were not included because they exceed the email size limit: "
+            f"{', '.join(omitted)}."
+        )
 
     print(f'To ID {str(to)}')
 
@@ -32,27 +331,12 @@ def send_email(to: str, subject: str, body: str, attachments: list = None):
     message["To"] = to
     message["Subject"] = subject
     message.add_header('reply-to', common_constants.REPLY_TO_ADDRESS)
-    message.attach(MIMEText(body, "plain"))
-    
-    # attach the attachments if provided
-    if attachments:
-        for attachment in attachments:
-            try:
-                with open(attachment, "rb") as file:
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(file.read())
-                    encoders.encode_base64(part)
-                    part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(attachment)}")
-                    message.attach(part)
-            except Exception as e:
-                print(f"Failed to attach file {attachment}. Error: {e}")
-                return {"status": f"Failed to attach file {attachment}. Error: {e}"}
-
-    # Create SMTP session for sending the mail
+
+    # Stream the message through the shared transport
     try:
-        text = message.as_string()
-        server.sendmail(common_constants.EMAIL, to, text)
-        print("Email Sent Successfully.")
+        transport = get_transport()
+        transport.send(common_constants.EMAIL, to, lambda: iter_message(message, body, attachments))
+        print(f"Email Sent Successfully in {transport.counters['last_send_seconds']}s.")
         return {"status": "Email sent successfully."}
     except Exception as e:
         print("Email Failed to Send. Error: ", e)
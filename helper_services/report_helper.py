@@ -1,8 +1,6 @@
 import os
 import tempfile
 import numpy as np
-from openpyxl.styles import Font
-from openpyxl.utils import get_column_letter
 import pandas as pd
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import LETTER
@@ -15,6 +13,54 @@ from datetime import datetime, timezone
 import yaml
 
 
+def column_widths(df):
+    # width of every sheet column (index first): longest non-empty value or header plus a small padding
+    columns = [[None] + df.index.tolist()]
+    for col in df.columns:
+        columns.append([col] + df[col].tolist())
+
+    widths = []
+    for values in columns:
+        max_length = 0
+        for value in values:
+            if value and not pd.isna(value):
+                max_length = max(max_length, len(str(value)))
+        widths.append(max_length + 2)
+
+    return widths
+
+
+def write_recommendations_workbook(xlsx_filepath, sheets):
+    # streams every (sheet name, DataFrame) pair into a write-only workbook and saves it once;
+    # openpyxl is only loaded when there are recommendations to write
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+
+    for sheet_name, df in sheets:
+        ws = wb.create_sheet(title=sheet_name)
+
+        for column, width in enumerate(column_widths(df), start=1):
+            ws.column_dimensions[get_column_letter(column)].width = width
+
+        header = []
+        for col in df.columns:
+            cell = WriteOnlyCell(ws, value=col)
+            if col == "Gradient Score":
+                cell.font = Font(color="FF0000", bold=True)
+            header.append(cell)
+        ws.append([None] + header)
+
+        columns = [df.index.tolist()] + [df[col].tolist() for col in df.columns]
+        for row in zip(*columns):
+            ws.append([None if pd.isna(value) else value for value in row])
+
+    wb.save(xlsx_filepath)
+
+
 def generate_report(outcome_column, causal_analysis_results, unique_id, run_ids, filters):
     # Set up parameters
     script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -170,6 +216,8 @@ def generate_report(outcome_column, causal_analysis_results, unique_id, run_ids,
 
     analysis_groups = {k: v for k, v in causal_analysis_results.items() if k != "_metadata"}
 
+    xlsx_sheets = []
+
     if len(analysis_groups) == 0:
         elements.append(Paragraph(f"<b>Analysis:</b> Effects on {outcome_column} (0 experiments)", header_style))
         elements.append(Paragraph("Insufficient data to perform causal analysis.", body_style))
@@ -277,29 +325,9 @@ def generate_report(outcome_column, causal_analysis_results, unique_id, run_ids,
 
                 table.setStyle(TableStyle(table_style))
 
-                mode = "a" if os.path.exists(xlsx_filepath) else "w"
-                with pd.ExcelWriter(xlsx_filepath, engine="openpyxl", mode=mode) as writer:
-                    reco_df = pd.DataFrame(group_data["recommendations"], columns=group_data['recommend_dims'] + ['Gradient Score'])
-                    reco_df.index = reco_df.index + 1
-                    reco_df.to_excel(writer, sheet_name=group, index=True)
-
-                    ws = writer.sheets[group]
-                    col_idx = reco_df.columns.get_loc("Gradient Score") + 2
-                    ws.cell(row=1, column=col_idx).font = Font(color="FF0000", bold=True)
-
-                    for column_cells in ws.columns:
-                        max_length = 0
-                        column = column_cells[0].column  # column index (1-based)
-
-                        for cell in column_cells:
-                            try:
-                                if cell.value:
-                                    max_length = max(max_length, len(str(cell.value)))
-                            except:
-                                pass
-
-                        adjusted_width = max_length + 2  # small padding
-                        ws.column_dimensions[get_column_letter(column)].width = adjusted_width
+                reco_df = pd.DataFrame(group_data["recommendations"], columns=group_data['recommend_dims'] + ['Gradient Score'])
+                reco_df.index = reco_df.index + 1
+                xlsx_sheets.append((group, reco_df))
 
                 elements.append(table)
                 elements.append(spacer)
@@ -365,6 +393,10 @@ def generate_report(outcome_column, causal_analysis_results, unique_id, run_ids,
 
         elements.append(filters_table)
 
+    # Write all recommendation sheets at once
+    if len(xlsx_sheets) > 0:
+        write_recommendations_workbook(xlsx_filepath, xlsx_sheets)
+
     # Build the PDF
     doc.build(elements)
 
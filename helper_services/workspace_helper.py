@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from common.common_constants import CONTAINER_TMP_DIR, WORKSPACE_STALE_SECONDS
+
+
+WORKSPACE_ROOT = os.environ.get("CAUSALBENCH_WORKSPACE_DIR", os.path.join(CONTAINER_TMP_DIR, "causalbench_workspaces"))
+MPLCONFIG_DIR = os.environ.get("CAUSALBENCH_MPLCONFIG_DIR", os.path.join(CONTAINER_TMP_DIR, "causalbench_mplconfig"))
+
+WORKSPACE_ENV_VARS = ("TMPDIR", "TEMP", "TMP", "HOME", "USERPROFILE", "MPLCONFIGDIR")
+
+_active_workspaces = set()
+_active_lock = threading.Lock()
+
+
+def directory_usage(path):
+    """
+    Count the files below a directory and the bytes they occupy.
+
+    :param path: Directory to measure
+    :return: Number of files and total bytes
+    """
+    files = 0
+    total_bytes = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total_bytes += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+            files += 1
+    return files, total_bytes
+
+
+def sweep_stale_workspaces(root=WORKSPACE_ROOT, stale_after=WORKSPACE_STALE_SECONDS):
+    """
+    Remove workspaces left behind by requests that never reached their cleanup.
+
+    A workspace counts as stale when no request in this process uses it and it was last modified
+    more than ``stale_after`` seconds ago, which is longer than any Lambda invocation can run.
+
+    :param root: Directory holding the workspaces
+    :param stale_after: Minimum age in seconds of a removed workspace
+    :return: Number of removed workspaces and the bytes they occupied
+    """
+    if not os.path.isdir(root):
+        return 0, 0
+
+    removed = 0
+    removed_bytes = 0
+    cutoff = time.time() - stale_after
+    with _active_lock:
+        active = set(_active_workspaces)
+
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if path in active or not os.path.isdir(path):
+            continue
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            continue
+        removed_bytes += directory_usage(path)[1]
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+        print(f"Removed stale workspace {path}")
+
+    return removed, removed_bytes
+
+
+class RequestWorkspace:
+    """
+    Private scratch directory for one request, removed again when the request ends.
+
+    On entry the workspace is created below ``root`` and TMPDIR, TEMP, TMP, HOME and USERPROFILE
+    point into it, so downloads and report files of the request land there. MPLCONFIGDIR points at
+    a directory shared by all requests, so the matplotlib font cache is built once per container.
+    On exit the previous environment is restored and the workspace is deleted, whether or not the
+    request failed. The environment is process-wide, so only one request may use it at a time.
+    """
+
+    def __init__(self, root=WORKSPACE_ROOT, mplconfig_dir=MPLCONFIG_DIR, stale_after=WORKSPACE_STALE_SECONDS):
+        self.root = root
+        self.mplconfig_dir = mplconfig_dir
+        self.stale_after = stale_after
+        self.path = None
+        self.home_dir = None
+        self.telemetry = {}
+        self._saved_env = {}
+        self._saved_tempdir = None
+        self._start = None
+
+    def __enter__(self):
+        os.makedirs(self.root, exist_ok=True)
+        os.makedirs(self.mplconfig_dir, exist_ok=True)
+        swept, swept_bytes = sweep_stale_workspaces(self.root, self.stale_after)
+
+        self.path = tempfile.mkdtemp(prefix="request-", dir=self.root)
+        self.home_dir = os.path.join(self.path, "home")
+        os.makedirs(self.home_dir)
+        with _active_lock:
+            _active_workspaces.add(self.path)
+
+        self._saved_env = {name: os.environ.get(name) for name in WORKSPACE_ENV_VARS}
+        self._saved_tempdir = tempfile.tempdir
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            os.environ[name] = self.path
+        for name in ("HOME", "USERPROFILE"):
+            os.environ[name] = self.home_dir
+        os.environ["MPLCONFIGDIR"] = self.mplconfig_dir
+        tempfile.tempdir = self.path
+
+        self.telemetry = {"workspace": self.path, "swept": swept, "swept_bytes": swept_bytes}
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        tempfile.tempdir = self._saved_tempdir
+
+        files, total_bytes = directory_usage(self.path)
+        shutil.rmtree(self.path, ignore_errors=True)
+        with _active_lock:
+            _active_workspaces.discard(self.path)
+
+        disk = shutil.disk_usage(self.root)
+        self.telemetry.update({
+            "files": files,
+            "bytes": total_bytes,
+            "seconds": round(time.perf_counter() - self._start, 4),
+            "mplconfig_bytes": directory_usage(self.mplconfig_dir)[1],
+            "disk_free_bytes": disk.free,
+            "disk_total_bytes": disk.total,
+        })
+        print(f"Workspace stats: {self.telemetry}")
+        return False
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+from common.common_constants import CONTAINER_TMP_DIR, ZIP_CACHE_MAX_BYTES
+
+
+ZIP_CACHE_DIR = os.environ.get("CAUSALBENCH_ZIP_CACHE_DIR", os.path.join(CONTAINER_TMP_DIR, "causalbench_zip_cache"))
+
+
+def cache_key(url):
+    """
+    Build the cache key for a run archive URL.
+
+    Download URLs carry the archive name in the ``profiling_link`` query parameter, which
+    identifies the run independently of host or extra query arguments.
+
+    :param url: URL of the ZIP file
+    """
+    parsed_url = urlparse(url)
+    profiling_link = parse_qs(parsed_url.query).get("profiling_link")
+    if profiling_link:
+        return profiling_link[0]
+    return parsed_url._replace(fragment="").geturl()
+
+
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ZipCache:
+    """
+    Content-addressed, size-bounded LRU cache for downloaded run archives.
+
+    Archives are stored once per SHA-256 digest under ``objects/`` and several keys may point at
+    the same object. The least recently used keys are evicted until the stored objects fit into
+    ``max_bytes``. Every hit re-hashes the stored object, so a corrupted entry is dropped and
+    reported as a miss instead of being handed to the analysis.
+    """
+
+    def __init__(self, cache_dir=ZIP_CACHE_DIR, max_bytes=ZIP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._load_index()
+
+    def _object_path(self, sha256):
+        return os.path.join(self.objects_dir, f"{sha256}.zip")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+
+        for key, entry in entries:
+            if os.path.exists(self._object_path(entry["sha256"])):
+                self._entries[key] = entry
+
+    def _save_index(self):
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(temp_path, self.index_path)
+
+    def _stored_bytes(self):
+        sizes = {entry["sha256"]: entry["size"] for entry in self._entries.values()}
+        return sum(sizes.values())
+
+    def _release_object(self, sha256):
+        if not any(entry["sha256"] == sha256 for entry in self._entries.values()):
+            try:
+                os.remove(self._object_path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self._entries and self._stored_bytes() > self.max_bytes:
+            key, entry = self._entries.popitem(last=False)
+            self._release_object(entry["sha256"])
+            self.counters["evictions"] += 1
+            print(f"Evicted {key} from ZIP cache")
+
+    def fetch(self, url, target_path):
+        """
+        Copy the cached archive for ``url`` to ``target_path``.
+
+        :param url: URL of the ZIP file
+        :param target_path: Destination of the cached archive
+        :return: True on a verified cache hit, False on a miss
+        """
+        key = cache_key(url)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return False
+            self._entries.move_to_end(key)
+
+        object_path = self._object_path(entry["sha256"])
+        try:
+            verified = file_sha256(object_path) == entry["sha256"]
+        except OSError:
+            verified = False
+
+        if not verified:
+            with self._lock:
+                if self._entries.get(key) == entry:
+                    del self._entries[key]
+                    self._release_object(entry["sha256"])
+                    self._save_index()
+                self.counters["misses"] += 1
+            print(f"Discarded corrupted ZIP cache entry for {key}")
+            return False
+
+        # link or copy next to the target and move it into place, so an existing file at
+        # target_path (possibly another link to a cached object) is replaced, never written through
+        temp_path = f"{target_path}.{threading.get_ident()}.tmp"
+        try:
+            os.link(object_path, temp_path)
+        except OSError:
+            shutil.copyfile(object_path, temp_path)
+        os.replace(temp_path, target_path)
+
+        with self._lock:
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += entry["size"]
+        return True
+
+    def store(self, url, source_path):
+        """
+        Add a freshly downloaded archive to the cache.
+
+        :param url: URL the archive was downloaded from
+        :param source_path: Path of the downloaded archive
+        """
+        size = os.path.getsize(source_path)
+        if size > self.max_bytes:
+            print(f"Not caching {source_path}: {size} bytes exceeds the cache limit")
+            return
+
+        sha256 = file_sha256(source_path)
+        object_path = self._object_path(sha256)
+
+        # link the download into the cache outside the lock, so a miss is not stored twice in /tmp
+        # and other downloads do not wait for a copy; downloads are only ever replaced, never
+        # rewritten in place, so sharing the inode is safe. Copy only when linking fails.
+        temp_path = None
+        if not os.path.exists(object_path):
+            temp_path = f"{object_path}.{threading.get_ident()}.tmp"
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            try:
+                os.link(source_path, temp_path)
+            except OSError:
+                shutil.copyfile(source_path, temp_path)
+
+        with self._lock:
+            if temp_path is not None:
+                os.replace(temp_path, object_path)
+
+            key = cache_key(url)
+            previous = self._entries.pop(key, None)
+            self._entries[key] = {"sha256": sha256, "size": size}
+            if previous is not None and previous["sha256"] != sha256:
+                self._release_object(previous["sha256"])
+
+            self._evict()
+            self._save_index()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), stored_bytes=self._stored_bytes())
+
+
+_zip_cache = None
+
+
+def get_zip_cache():
+    """
+    Return the container-wide ZIP cache, creating it on first use.
+    """
+    global _zip_cache
+    if _zip_cache is None:
+        _zip_cache = ZipCache()
+    return _zip_cache
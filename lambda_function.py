@@ -1,17 +1,21 @@
 from collections import defaultdict
+import math
 import os
-import tempfile
 
-import causalbench
-from helper_services.causal_analysis_helper import run_causal_analysis
-import math
-from helper_services.causal_recommendation_helper import run_causal_recommendation
-from helper_services.g2s_causal_recommendation_helper import run_g2s_causal_recommendation
+from common.common_constants import DELIVERY_WAIT_MARGIN_SECONDS, DELIVERY_WAIT_SECONDS
+from common.lazy_import import lazy_callable, load_module, load_timings
 from helper_services.download_helper import download_files
-from helper_services.report_helper import generate_report
-from helper_services.hp_dtype_helper import get_hp_dtypes
-from helper_services.mail_helper import send_email
-import numpy as np
+from helper_services.delivery_helper import OUTBOX_IS_SHARED, drain_outbox, enqueue_report, resume_delivery, wait_for_delivery
+from helper_services.workspace_helper import RequestWorkspace
+
+
+# the analysis, recommendation and report stages pull in pandas, causalbench, DoWhy, scikit-learn,
+# SciPy and ReportLab, so each one is imported the first time it runs instead of at cold start
+load_run_data = lazy_callable("helper_services.causal_analysis_helper", "load_run_data")
+run_causal_analysis = lazy_callable("helper_services.causal_analysis_helper", "run_causal_analysis")
+run_causal_recommendation = lazy_callable("helper_services.causal_recommendation_helper", "run_causal_recommendation")
+run_g2s_causal_recommendation = lazy_callable("helper_services.g2s_causal_recommendation_helper", "run_g2s_causal_recommendation")
+generate_report = lazy_callable("helper_services.report_helper", "generate_report")
 
 
 def build_email_body(causal_analysis_results, event):
@@ -63,36 +67,44 @@ def build_email_body(causal_analysis_results, event):
     return "\n".join(lines)
 
 
-def configure_env():
+def set_access_token(token):
     """
-    Directory setup to ensure isolation
+    Hand the caller's JWT token to causalbench, importing it on first use
     """
-    # fake temporary directory
-    temp_dir = tempfile.mkdtemp()
-    tempfile.tempdir = None
-    os.environ["TMPDIR"] = temp_dir
-    os.environ["TEMP"] = temp_dir
-    os.environ["TMP"] = temp_dir
+    auth = load_module("causalbench.services.auth")
+    auth.__access_token = token
 
-    # fake home directory
-    home_dir = os.path.join(temp_dir, "home")
-    os.makedirs(home_dir, exist_ok=True)
-    os.environ["HOME"] = home_dir
-    os.environ["USERPROFILE"] = home_dir
 
-    # fake mpl config directory
-    os.environ["MPLCONFIGDIR"] = os.path.join(temp_dir, "mplconfig")
+def delivery_wait_seconds(context):
+    """
+    Seconds the handler may wait for the report email, read from DELIVERY_WAIT_SECONDS and bounded by
+    the invocation's remaining time; 0 when the outbox is shared, since drain_handler delivers it
+    """
+    if OUTBOX_IS_SHARED:
+        return 0
+    wait = float(os.environ.get("DELIVERY_WAIT_SECONDS", DELIVERY_WAIT_SECONDS))
+    get_remaining_time = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining_time is None:
+        return max(0, wait)
+    return max(0, min(wait, get_remaining_time() / 1000 - DELIVERY_WAIT_MARGIN_SECONDS))
 
 
 def handler(event, context):
-    # configure the environment variables
-    configure_env()
+    # every request runs in its own workspace, which is removed before returning
+    with RequestWorkspace():
+        return process_event(event, context)
+
+
+def process_event(event, context=None):
+    # resume report retries that became due while the container was idle; the worker exits again
+    # once nothing is due, so it does not keep parallel_map from forking for the rest of the request
+    resume_delivery()
 
     # set JWT token
-    causalbench.services.auth.__access_token = event.get('jwt_token', None)
+    set_access_token(event.get('jwt_token', None))
 
     # maximum recommended points
-    max_points = max(math.ceil(np.sqrt(len(event.get('zip_urls', [])))), 50)
+    max_points = max(math.ceil(math.sqrt(len(event.get('zip_urls', [])))), 50)
 
     # outcome column
     outcome_column = event.get('outcome_column', 'Time.Duration')
@@ -100,15 +112,17 @@ def handler(event, context):
     # download zip files
     download_dir, downloaded_files = download_files(zip_urls=event.get('zip_urls', []))
 
-    # find all hyperparameter data types
-    hp_dtypes = get_hp_dtypes(download_dir)
+    # parse all runs once, collecting rows and hyperparameter data types
+    raw_df, hp_dtypes = load_run_data(download_dir)
     
     # find all causal effects
     causal_analysis_results, download_dir = run_causal_analysis(
         download_dir=download_dir,
         data_types=hp_dtypes,
         outcome_column=outcome_column,
-        candidates=event.get('candidate_hyperparameters', None)
+        candidates=event.get('candidate_hyperparameters', None),
+        raw_df=raw_df,
+        estimator=event.get('causal_estimator', None)
     )
 
     # find all causal recommendations
@@ -131,7 +145,9 @@ def handler(event, context):
                 cols = ["HP." + dim for dim in dimensions.keys()]
                 
                 sample_frame = group_data["data"][cols + ["outcome"]].copy()
-                group_data['recommendations'] = run_g2s_causal_recommendation(sample_frame, dimensions, hp_dtypes, max_points)
+                group_data['recommendations'] = run_g2s_causal_recommendation(
+                    sample_frame, dimensions, hp_dtypes, max_points, sampling_mode=event.get('sampling_mode', None)
+                )
             else:
                 print(f"Skipping Causal Recommendation for {group} as len(dimensions) == 0.")
         except Exception as e:
@@ -147,13 +163,31 @@ def handler(event, context):
     if os.path.exists(xlsx_filepath):
         attachments.append(xlsx_filepath)
     
+    # queue the email and return its ticket; waiting for the delivery worker, which is frozen with
+    # the container once the handler returns, is opt-in through DELIVERY_WAIT_SECONDS
     try:
-        send_email(event.get('user_email'), "[CausalBench] Causal Analysis Results", build_email_body(causal_analysis_results, event), attachments=attachments)
+        delivery = enqueue_report(event.get('user_email'), "[CausalBench] Causal Analysis Results", build_email_body(causal_analysis_results, event), attachments=attachments)
+        wait_seconds = delivery_wait_seconds(context)
+        if wait_seconds > 0:
+            delivery = wait_for_delivery(delivery["ticket"], wait_seconds)
+        print(f"Report delivery: {delivery}")
     except Exception as e:
-        print(f"Error sending email: {e}")
+        print(f"Error queuing email: {e}")
+        delivery = {"ticket": None, "status": f"Failed to queue email. Error: {e}"}
     
+    print(f"Stage import times: {load_timings()}")
+
     response = {
-        "analysis_results": causal_analysis_results
+        "analysis_results": causal_analysis_results,
+        "delivery": delivery
     }
     
     return response
+
+
+def drain_handler(event, context):
+    """
+    Flush the report outbox, retrying deliveries whose backoff has expired; only reaches tickets of
+    other invocations when CAUSALBENCH_OUTBOX_DIR is on storage shared with them
+    """
+    return drain_outbox()
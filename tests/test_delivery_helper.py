@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import helper_services.delivery_helper as delivery_helper
+from helper_services.delivery_helper import (
+    drain_outbox,
+    enqueue_report,
+    next_attempt_delay,
+    pending_tickets,
+    resume_delivery,
+    ticket_status,
+    wait_for_delivery,
+)
+
+
+class TestDeliveryHelper(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.outbox_dir = os.path.join(temp_dir.name, "outbox")
+        self.report_path = os.path.join(temp_dir.name, "report.pdf")
+        with open(self.report_path, "wb") as file:
+            file.write(b"pdf")
+
+    def _enqueue(self):
+        return enqueue_report(
+            "user@example.com", "Subject", "Body", attachments=[self.report_path], outbox_dir=self.outbox_dir, start_worker=False
+        )
+
+    def _manifest(self, ticket):
+        with open(os.path.join(self.outbox_dir, ticket, "manifest.json")) as file:
+            return json.load(file)
+
+    def test_enqueue_report_copies_attachments_and_returns_ticket(self):
+        with patch("helper_services.delivery_helper.start_delivery_worker") as worker_mock:
+            delivery = enqueue_report("user@example.com", "Subject", "Body", attachments=[self.report_path], outbox_dir=self.outbox_dir)
+
+        worker_mock.assert_called_once_with(self.outbox_dir)
+        self.assertEqual(delivery["status"], "queued")
+        self.assertEqual(pending_tickets(self.outbox_dir), [delivery["ticket"]])
+
+        manifest = self._manifest(delivery["ticket"])
+        self.assertEqual(manifest["to"], "user@example.com")
+        self.assertEqual(manifest["attachments"], ["report.pdf"])
+        with open(os.path.join(self.outbox_dir, delivery["ticket"], "report.pdf"), "rb") as file:
+            self.assertEqual(file.read(), b"pdf")
+
+    def test_drain_outbox_sends_and_removes_ticket(self):
+        ticket = self._enqueue()["ticket"]
+
+        with patch(
+            "helper_services.delivery_helper.send_email", return_value={"status": "Email sent successfully."}
+        ) as send_mock:
+            summary = drain_outbox(self.outbox_dir)
+
+        self.assertEqual(summary["sent"], [ticket])
+        self.assertEqual(pending_tickets(self.outbox_dir), [])
+        self.assertFalse(os.path.exists(os.path.join(self.outbox_dir, ticket)))
+        self.assertEqual(os.listdir(os.path.join(self.outbox_dir, "sent", ticket)), ["manifest.json"])
+        self.assertEqual(ticket_status(ticket, self.outbox_dir)["status"], "sent")
+        self.assertEqual(send_mock.call_args.args[0], "user@example.com")
+        self.assertEqual(
+            send_mock.call_args.kwargs["attachments"], [os.path.join(self.outbox_dir, ticket, "report.pdf")]
+        )
+        self.assertEqual(send_mock.call_args.kwargs["archive_dir"], os.path.join(self.outbox_dir, ticket))
+
+    def test_drain_outbox_backs_off_exponentially_after_failures(self):
+        ticket = self._enqueue()["ticket"]
+
+        with patch("helper_services.delivery_helper.send_email", return_value={"status": "Failed to send email."}), patch(
+            "helper_services.delivery_helper.time.time"
+        ) as time_mock:
+            time_mock.return_value = 100.0
+            self.assertEqual(drain_outbox(self.outbox_dir, base_delay=10)["retry"], [ticket])
+            self.assertEqual(self._manifest(ticket)["next_attempt"], 110.0)
+
+            time_mock.return_value = 105.0
+            self.assertEqual(drain_outbox(self.outbox_dir, base_delay=10)["waiting"], [ticket])
+            self.assertEqual(next_attempt_delay(self.outbox_dir), 5.0)
+
+            time_mock.return_value = 200.0
+            self.assertEqual(drain_outbox(self.outbox_dir, base_delay=10)["retry"], [ticket])
+
+        manifest = self._manifest(ticket)
+        self.assertEqual(manifest["attempts"], 2)
+        self.assertEqual(manifest["next_attempt"], 220.0)
+
+    def test_drain_outbox_moves_ticket_to_failed_after_max_attempts(self):
+        ticket = self._enqueue()["ticket"]
+
+        with patch("helper_services.delivery_helper.send_email", side_effect=OSError("smtp down")):
+            summary = drain_outbox(self.outbox_dir, max_attempts=1)
+
+        self.assertEqual(summary["failed"], [ticket])
+        self.assertEqual(pending_tickets(self.outbox_dir), [])
+        self.assertIsNone(next_attempt_delay(self.outbox_dir))
+        self.assertTrue(os.path.exists(os.path.join(self.outbox_dir, "failed", ticket, "manifest.json")))
+
+    def test_wait_for_delivery_reports_the_first_attempt(self):
+        for send_status, expected in (("Email sent successfully.", "sent"), ("Failed to send email. Error: 535", "retry")):
+            with patch("helper_services.delivery_helper.send_email", return_value={"status": send_status}):
+                ticket = enqueue_report(
+                    "user@example.com", "Subject", "Body", attachments=[self.report_path], outbox_dir=self.outbox_dir
+                )["ticket"]
+                delivery = wait_for_delivery(ticket, timeout=10, outbox_dir=self.outbox_dir, poll_interval=0.01)
+
+            self.assertEqual(delivery["ticket"], ticket)
+            self.assertEqual(delivery["status"], expected)
+            self.assertEqual(delivery["last_status"], send_status)
+            # the worker exits on its own, even while the retry is pending
+            worker = delivery_helper._worker
+            if worker is not None:
+                worker.join(timeout=10)
+                self.assertFalse(worker.is_alive())
+            shutil.rmtree(self.outbox_dir)
+
+    def test_wait_for_delivery_returns_queued_when_time_runs_out(self):
+        ticket = self._enqueue()["ticket"]
+
+        delivery = wait_for_delivery(ticket, timeout=0.05, outbox_dir=self.outbox_dir, poll_interval=0.01)
+
+        self.assertEqual(delivery["status"], "queued")
+        self.assertEqual(delivery["attempts"], 0)
+
+    def test_ticket_status_reports_failed_tickets(self):
+        ticket = self._enqueue()["ticket"]
+        with patch("helper_services.delivery_helper.send_email", side_effect=OSError("smtp down")):
+            drain_outbox(self.outbox_dir, max_attempts=1)
+
+        status = ticket_status(ticket, self.outbox_dir)
+
+        self.assertEqual((status["status"], status["attempts"]), ("failed", 1))
+        self.assertIn("smtp down", status["last_status"])
+
+    def test_ticket_status_reports_unknown_tickets(self):
+        self._enqueue()
+
+        status = ticket_status("20240101000000-mistyped", self.outbox_dir)
+
+        self.assertEqual(status["status"], "unknown")
+        self.assertIsNone(status["last_status"])
+
+    def test_drain_outbox_prunes_old_sent_records(self):
+        ticket = self._enqueue()["ticket"]
+        with patch("helper_services.delivery_helper.send_email", return_value={"status": "Email sent successfully."}):
+            drain_outbox(self.outbox_dir)
+        sent_record = os.path.join(self.outbox_dir, "sent", ticket)
+        os.utime(sent_record, (0, 0))
+
+        drain_outbox(self.outbox_dir)
+
+        self.assertFalse(os.path.exists(sent_record))
+        self.assertEqual(ticket_status(ticket, self.outbox_dir)["status"], "unknown")
+
+    def test_worker_keeps_draining_while_tickets_are_due(self):
+        # a ticket queued between the worker's drain and its exit check must still be drained
+        with patch("helper_services.delivery_helper.drain_outbox") as drain_mock, patch(
+            "helper_services.delivery_helper.next_attempt_delay", side_effect=[0.0, None]
+        ):
+            worker = threading.Thread(target=delivery_helper._run_worker, args=(self.outbox_dir,))
+            worker.start()
+            worker.join(timeout=10)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(drain_mock.call_count, 2)
+        self.assertIsNone(delivery_helper._worker)
+
+    def test_resume_delivery_restarts_the_worker_for_due_retries(self):
+        ticket = self._enqueue()["ticket"]
+        with patch("helper_services.delivery_helper.send_email", return_value={"status": "Failed to send email."}):
+            drain_outbox(self.outbox_dir, base_delay=10)
+
+        with patch("helper_services.delivery_helper.start_delivery_worker") as worker_mock:
+            self.assertIsNone(resume_delivery(self.outbox_dir))
+            worker_mock.assert_not_called()
+
+            manifest = self._manifest(ticket)
+            manifest["next_attempt"] = 0
+            with open(os.path.join(self.outbox_dir, ticket, "manifest.json"), "w") as file:
+                json.dump(manifest, file)
+            resume_delivery(self.outbox_dir)
+
+        worker_mock.assert_called_once_with(self.outbox_dir)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,8 @@ import tempfile
 import unittest
 from unittest.mock import Mock, patch
 
-from helper_services.download_helper import download_files, download_zip_from_url, fetch_zip_files
+from helper_services.download_helper import download_files, download_zip_from_url, fetch_zip_files, zip_filename
+from helper_services.zip_cache_helper import ZipCache
 
 
 class TestDownloadHelper(unittest.TestCase):
@@ -16,7 +17,8 @@ class TestDownloadHelper(unittest.TestCase):
             with patch("helper_services.download_helper.requests.get", return_value=mock_response):
                 path = download_zip_from_url("https://example.com/my-data.zip", download_dir)
 
-            self.assertTrue(path.endswith("my-data.zip"))
+            self.assertTrue(os.path.basename(path).startswith("my-data_"))
+            self.assertTrue(path.endswith(".zip"))
             self.assertTrue(os.path.exists(path))
             with open(path, "rb") as file:
                 self.assertEqual(file.read(), b"abc123")
@@ -37,9 +39,22 @@ class TestDownloadHelper(unittest.TestCase):
             self.assertTrue(basename.endswith(".zip"))
             self.assertTrue(os.path.exists(path))
 
+    def test_zip_filename_is_unique_per_url(self):
+        urls = [
+            f"https://causalbench.org/api/runs/profiling/download?profiling_link=runs-{index}-run.zip"
+            for index in range(300)
+        ]
+        urls += ["https://a.example.com/data.zip", "https://b.example.com/data.zip"]
+
+        names = [zip_filename(url) for url in urls]
+
+        self.assertEqual(len(set(names)), len(urls))
+        self.assertTrue(names[0].startswith("runs-0-run_"))
+        self.assertEqual(zip_filename(urls[0]), names[0])
+
     def test_fetch_zip_files_returns_sorted_downloaded_paths(self):
         with tempfile.TemporaryDirectory() as download_dir:
-            with patch("helper_services.download_helper.atexit.register"), patch(
+            with patch(
                 "helper_services.download_helper.download_zip_from_url",
                 side_effect=[
                     os.path.join(download_dir, "b.zip"),
@@ -56,13 +71,45 @@ class TestDownloadHelper(unittest.TestCase):
         )
         self.assertEqual(download_mock.call_count, 2)
 
+    def test_fetch_zip_files_shares_session_and_reports_sorted_stats(self):
+        stats = []
+        with tempfile.TemporaryDirectory() as download_dir:
+            def fake_download(url, target_dir, session=None):
+                path = os.path.join(target_dir, os.path.basename(url))
+                with open(path, "wb") as file:
+                    file.write(b"x" * len(url))
+                return path
+
+            with patch(
+                "helper_services.download_helper.download_zip_from_url",
+                side_effect=fake_download,
+            ) as download_mock:
+                result = fetch_zip_files(
+                    ["https://x.com/c.zip", "https://x.com/a.zip", "https://x.com/bb.zip"],
+                    download_dir,
+                    max_workers=3,
+                    stats=stats,
+                )
+
+        self.assertEqual([os.path.basename(path) for path in result], ["a.zip", "bb.zip", "c.zip"])
+        self.assertEqual(
+            [record["url"] for record in stats],
+            ["https://x.com/a.zip", "https://x.com/bb.zip", "https://x.com/c.zip"],
+        )
+        self.assertEqual([record["bytes"] for record in stats], [19, 20, 19])
+        sessions = {id(call.kwargs["session"]) for call in download_mock.call_args_list}
+        self.assertEqual(len(sessions), 1)
+
     def test_download_files_with_empty_list_returns_none(self):
         with patch("helper_services.download_helper.fetch_zip_files") as fetch_mock:
             self.assertIsNone(download_files([]))
         fetch_mock.assert_not_called()
 
     def test_download_files_with_urls_returns_directory_and_files(self):
+        cache = Mock()
         with patch("helper_services.download_helper.tempfile.gettempdir", return_value="/tmp"), patch(
+            "helper_services.download_helper.get_zip_cache", return_value=cache
+        ), patch(
             "helper_services.download_helper.fetch_zip_files",
             return_value=["/tmp/causal_analysis_fixed/a.zip"],
         ) as fetch_mock:
@@ -71,9 +118,33 @@ class TestDownloadHelper(unittest.TestCase):
         self.assertEqual(download_dir, "/tmp/causal_analysis_fixed")
         self.assertEqual(downloaded_files, ["/tmp/causal_analysis_fixed/a.zip"])
         fetch_mock.assert_called_once_with(
-            ["https://example.com/a.zip"], "/tmp/causal_analysis_fixed"
+            ["https://example.com/a.zip"], "/tmp/causal_analysis_fixed", max_workers=None, cache=cache
         )
 
+    def test_fetch_zip_files_serves_repeated_urls_from_cache(self):
+        url = "https://example.com/download?profiling_link=runs-1-run.zip"
+        mock_response = Mock()
+        mock_response.raise_for_status = Mock()
+        mock_response.iter_content = Mock(return_value=[b"zip-bytes"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            stats = []
+            with patch("helper_services.download_helper.create_session") as session_mock:
+                session_mock.return_value.__enter__.return_value.get.return_value = mock_response
+                first = fetch_zip_files([url], os.path.join(temp_dir, "first"), cache=cache, stats=stats)
+                second = fetch_zip_files([url], os.path.join(temp_dir, "second"), cache=cache, stats=stats)
+
+                with open(second[0], "rb") as file:
+                    self.assertEqual(file.read(), b"zip-bytes")
+
+            session = session_mock.return_value.__enter__.return_value
+            self.assertEqual(session.get.call_count, 1)
+            self.assertEqual(os.path.basename(first[0]), os.path.basename(second[0]))
+            self.assertEqual([record["cached"] for record in stats], [False, True])
+            self.assertEqual(cache.stats()["hits"], 1)
+            self.assertEqual(cache.stats()["misses"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,4 @@
 import importlib
-import math
 import os
 from pathlib import Path
 import sys
@@ -8,6 +7,8 @@ import types
 import unittest
 from unittest.mock import patch
 
+from helper_services.workspace_helper import RequestWorkspace
+
 
 class DummyFrame:
     def __getitem__(self, _):
@@ -19,18 +20,11 @@ class DummyFrame:
 
 class TestLambdaHandler(unittest.TestCase):
     def _import_lambda_module_with_stubs(self):
-        fake_causalbench = types.ModuleType("causalbench")
-        fake_causalbench.services = types.SimpleNamespace(
-            auth=types.SimpleNamespace(__access_token=None)
-        )
-
-        fake_numpy = types.ModuleType("numpy")
-        fake_numpy.sqrt = math.sqrt
-
         fake_analysis_module = types.ModuleType("helper_services.causal_analysis_helper")
         fake_analysis_module.run_causal_analysis = (
             lambda *args, **kwargs: ({}, tempfile.gettempdir())
         )
+        fake_analysis_module.load_run_data = lambda *args, **kwargs: (DummyFrame(), {})
 
         fake_reco_module = types.ModuleType("helper_services.causal_recommendation_helper")
         fake_reco_module.run_causal_recommendation = lambda *args, **kwargs: []
@@ -50,22 +44,20 @@ class TestLambdaHandler(unittest.TestCase):
         fake_report_module = types.ModuleType("helper_services.report_helper")
         fake_report_module.generate_report = lambda *args, **kwargs: ("a.yml", "a.pdf", "a.xlsx")
 
-        fake_hp_dtype_module = types.ModuleType("helper_services.hp_dtype_helper")
-        fake_hp_dtype_module.get_hp_dtypes = lambda *args, **kwargs: {}
-
-        fake_mail_module = types.ModuleType("helper_services.mail_helper")
-        fake_mail_module.send_email = lambda *args, **kwargs: {"status": "ok"}
+        fake_delivery_module = types.ModuleType("helper_services.delivery_helper")
+        fake_delivery_module.OUTBOX_IS_SHARED = False
+        fake_delivery_module.enqueue_report = lambda *args, **kwargs: {"ticket": "t", "status": "queued"}
+        fake_delivery_module.resume_delivery = lambda *args, **kwargs: None
+        fake_delivery_module.drain_outbox = lambda *args, **kwargs: {"sent": []}
+        fake_delivery_module.wait_for_delivery = lambda ticket, timeout: {"ticket": ticket, "status": "sent"}
 
         stub_modules = {
-            "causalbench": fake_causalbench,
-            "numpy": fake_numpy,
             "helper_services.causal_analysis_helper": fake_analysis_module,
             "helper_services.causal_recommendation_helper": fake_reco_module,
             "helper_services.g2s_causal_recommendation_helper": fake_g2s_reco_module,
             "helper_services.download_helper": fake_download_module,
             "helper_services.report_helper": fake_report_module,
-            "helper_services.hp_dtype_helper": fake_hp_dtype_module,
-            "helper_services.mail_helper": fake_mail_module,
+            "helper_services.delivery_helper": fake_delivery_module,
         }
 
         sys.modules.pop("lambda_function", None)
@@ -94,6 +86,9 @@ class TestLambdaHandler(unittest.TestCase):
         lambda_module = self._import_lambda_module_with_stubs()
         self.addCleanup(lambda: sys.modules.pop("lambda_function", None))
 
+        fake_auth_module = types.ModuleType("causalbench.services.auth")
+        setattr(fake_auth_module, "__access_token", None)
+
         causal_results = {
             "Metric.Score": {
                 "effects": {"HP.min_samples_leaf": 0.8, "HP.max_features": 0},
@@ -102,7 +97,18 @@ class TestLambdaHandler(unittest.TestCase):
             }
         }
 
+        raw_frame = DummyFrame()
+
+        request_env = {}
+
+        def record_environment(*args, **kwargs):
+            request_env.update(
+                tmp=tempfile.gettempdir(), home=os.environ["HOME"], userprofile=os.environ["USERPROFILE"]
+            )
+            return download_dir, ["one.zip"]
+
         with tempfile.TemporaryDirectory() as temp_dir:
+            workspace_root = os.path.join(temp_dir, "workspaces")
             download_dir = os.path.join(temp_dir, "download")
             os.makedirs(download_dir, exist_ok=True)
             pdf_path = os.path.join(temp_dir, "out.pdf")
@@ -111,18 +117,24 @@ class TestLambdaHandler(unittest.TestCase):
             Path(xlsx_path).touch()
 
             with patch.object(
-                lambda_module, "download_files", return_value=(download_dir, ["one.zip"])
+                lambda_module,
+                "RequestWorkspace",
+                lambda: RequestWorkspace(root=workspace_root, mplconfig_dir=os.path.join(temp_dir, "mplconfig")),
+            ), patch.object(
+                lambda_module, "download_files", side_effect=record_environment
             ) as download_mock, patch.object(
-                lambda_module, "get_hp_dtypes", return_value={"min_samples_leaf": "integer"}
-            ) as dtypes_mock, patch.object(
+                lambda_module, "load_run_data", return_value=(raw_frame, {"min_samples_leaf": "integer"})
+            ) as load_mock, patch.object(
                 lambda_module, "run_causal_analysis", return_value=(causal_results, download_dir)
             ) as analysis_mock, patch.object(
                 lambda_module, "run_g2s_causal_recommendation", return_value=[{"delta": 1}]
             ) as reco_mock, patch.object(
                 lambda_module, "generate_report", return_value=("out.yml", pdf_path, xlsx_path)
             ) as report_mock, patch.object(
-                lambda_module, "send_email", return_value={"status": "ok"}
-            ) as email_mock:
+                lambda_module, "enqueue_report", return_value={"ticket": "ticket-1", "status": "queued"}
+            ) as email_mock, patch.object(
+                lambda_module, "wait_for_delivery", return_value={"ticket": "ticket-1", "status": "sent"}
+            ) as wait_mock, patch.dict(sys.modules, {"causalbench.services.auth": fake_auth_module}):
                 event = {
                     "zip_urls": ["https://example.com/a.zip"],
                     "outcome_column": "Metric.Score",
@@ -136,23 +148,30 @@ class TestLambdaHandler(unittest.TestCase):
                 }
                 response = lambda_module.handler(event, context={})
 
+            self.assertEqual(os.listdir(workspace_root), [])
+
         self.assertIn("analysis_results", response)
         self.assertIn("Metric.Score", response["analysis_results"])
+        # the default wait is 0, so the handler returns the queued ticket
+        self.assertEqual(response["delivery"], {"ticket": "ticket-1", "status": "queued"})
+        wait_mock.assert_not_called()
         self.assertEqual(
-            getattr(lambda_module.causalbench.services.auth, "__access_token"),
+            getattr(fake_auth_module, "__access_token"),
             "token-123",
         )
-        expected_home = os.path.join(tempfile.gettempdir(), "home")
-        self.assertEqual(os.path.normpath(os.environ["HOME"]), os.path.normpath(expected_home))
-        self.assertEqual(
-            os.path.normpath(os.environ["USERPROFILE"]),
-            os.path.normpath(expected_home),
-        )
-        self.assertTrue(os.path.isdir(expected_home))
+        self.assertEqual(os.path.dirname(request_env["tmp"]), workspace_root)
+        expected_home = os.path.join(request_env["tmp"], "home")
+        self.assertEqual(request_env["home"], expected_home)
+        self.assertEqual(request_env["userprofile"], expected_home)
+        self.assertEqual(os.environ.get("HOME"), original_home)
+        self.assertEqual(os.environ.get("USERPROFILE"), original_userprofile)
+        self.assertNotEqual(tempfile.gettempdir(), request_env["tmp"])
 
         download_mock.assert_called_once()
-        dtypes_mock.assert_called_once_with(download_dir)
+        load_mock.assert_called_once_with(download_dir)
         analysis_mock.assert_called_once()
+        self.assertIs(analysis_mock.call_args.kwargs["raw_df"], raw_frame)
+        self.assertEqual(analysis_mock.call_args.kwargs["data_types"], {"min_samples_leaf": "integer"})
         reco_mock.assert_called_once()
         report_mock.assert_called_once()
         email_mock.assert_called_once()
@@ -163,6 +182,44 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertIn(pdf_path, email_kwargs["attachments"])
         self.assertIn(xlsx_path, email_kwargs["attachments"])
 
+    def test_delivery_wait_is_bounded_by_remaining_time(self):
+        lambda_module = self._import_lambda_module_with_stubs()
+        self.addCleanup(lambda: sys.modules.pop("lambda_function", None))
+
+        def context(remaining_millis):
+            return types.SimpleNamespace(get_remaining_time_in_millis=lambda: remaining_millis)
+
+        self.assertEqual(lambda_module.delivery_wait_seconds({}), 0)
+
+        with patch.dict(os.environ, {"DELIVERY_WAIT_SECONDS": "60"}):
+            self.assertEqual(lambda_module.delivery_wait_seconds({}), 60)
+            self.assertEqual(lambda_module.delivery_wait_seconds(context(20000)), 20 - lambda_module.DELIVERY_WAIT_MARGIN_SECONDS)
+            self.assertEqual(lambda_module.delivery_wait_seconds(context(900000)), 60)
+            self.assertEqual(lambda_module.delivery_wait_seconds(context(1000)), 0)
+
+            # a shared outbox is delivered by drain_handler, so the handler never waits
+            with patch.object(lambda_module, "OUTBOX_IS_SHARED", True):
+                self.assertEqual(lambda_module.delivery_wait_seconds(context(900000)), 0)
+
+    def test_handler_waits_for_delivery_when_configured(self):
+        lambda_module = self._import_lambda_module_with_stubs()
+        self.addCleanup(lambda: sys.modules.pop("lambda_function", None))
+
+        with patch.dict(os.environ, {"DELIVERY_WAIT_SECONDS": "60"}), patch.multiple(
+            lambda_module,
+            download_files=lambda *args, **kwargs: (tempfile.gettempdir(), []),
+            load_run_data=lambda *args, **kwargs: (DummyFrame(), {}),
+            run_causal_analysis=lambda *args, **kwargs: ({}, tempfile.gettempdir()),
+            generate_report=lambda *args, **kwargs: ("a.yml", "a.pdf", "a.xlsx"),
+            enqueue_report=lambda *args, **kwargs: {"ticket": "t", "status": "queued"},
+        ), patch.object(
+            lambda_module, "wait_for_delivery", return_value={"ticket": "t", "status": "sent"}
+        ) as wait_mock, patch.dict(sys.modules, {"causalbench.services.auth": types.ModuleType("causalbench.services.auth")}):
+            response = lambda_module.process_event({"zip_urls": [], "user_email": "user@example.com"})
+
+        wait_mock.assert_called_once_with("t", 60)
+        self.assertEqual(response["delivery"], {"ticket": "t", "status": "sent"})
+
 
 if __name__ == "__main__":
     unittest.main()
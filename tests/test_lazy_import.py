@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from common.lazy_import import lazy_callable, load_timings
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_lazy_callable_imports_module_on_first_call(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, "lazy_stage_module.py"), "w") as f:
+                f.write("def double(value, factor=2):\n    return value * factor\n")
+            sys.path.insert(0, temp_dir)
+            self.addCleanup(sys.path.remove, temp_dir)
+            self.addCleanup(sys.modules.pop, "lazy_stage_module", None)
+
+            double = lazy_callable("lazy_stage_module", "double")
+
+            self.assertNotIn("lazy_stage_module", sys.modules)
+            self.assertEqual(double.__name__, "double")
+            self.assertEqual(double(3), 6)
+            self.assertEqual(double(3, factor=3), 9)
+            self.assertIn("lazy_stage_module", sys.modules)
+            self.assertIn("lazy_stage_module", load_timings())
+
+    def test_lazy_callable_reports_missing_module_on_call(self):
+        missing = lazy_callable("lazy_stage_module_missing", "run")
+
+        with self.assertRaises(ModuleNotFoundError):
+            missing()
+
+
+if __name__ == "__main__":
+    unittest.main()
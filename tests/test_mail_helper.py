@@ -0,0 +1,226 @@
+import email
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from email.mime.multipart import MIMEMultipart
+from email.policy import default
+from unittest.mock import Mock, patch
+
+from helper_services.mail_helper import (
+    FileDropTransport,
+    SMTPTransport,
+    create_transport,
+    iter_message,
+    pack_attachments,
+    send_email,
+    stream_sendmail,
+)
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that records the messages it receives."""
+
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b"220 stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.split(b" ")[0].strip().upper()
+            if command == b"DATA":
+                self.wfile.write(b"354 end data with <CR><LF>.<CR><LF>\r\n")
+                lines = []
+                for data_line in iter(self.rfile.readline, b".\r\n"):
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self.server.messages.append(b"".join(lines))
+                self.wfile.write(b"250 queued\r\n")
+                if self.server.drop_after_data:
+                    return
+            elif command == b"NOOP" and self.server.hang_on_noop:
+                # behave like a half-open connection: never answer
+                continue
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.drop_after_data = False
+        self.hang_on_noop = False
+
+
+class TestMailHelper(unittest.TestCase):
+    def _write(self, directory, name, content):
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        return path
+
+    def test_pack_attachments_zips_large_files_into_one_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            small = self._write(directory, "report.pdf", b"pdf")
+            large_a = self._write(directory, "a.xlsx", b"a" * 100)
+            large_b = self._write(directory, "b.xlsx", b"b" * 100)
+
+            with patch("helper_services.mail_helper.tempfile.gettempdir", return_value=directory):
+                packed, omitted = pack_attachments([small, large_a, large_b], zip_threshold=10, max_bytes=10_000)
+
+            self.assertEqual(omitted, [])
+            self.assertEqual(packed[0], small)
+            with zipfile.ZipFile(packed[1]) as archive:
+                self.assertEqual(sorted(archive.namelist()), ["a.xlsx", "b.xlsx"])
+                self.assertEqual(archive.read("a.xlsx"), b"a" * 100)
+
+    def test_pack_attachments_omits_files_beyond_size_cap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = self._write(directory, "first.pdf", b"x" * 60)
+            second = self._write(directory, "second.pdf", b"y" * 60)
+
+            packed, omitted = pack_attachments([first, second], zip_threshold=1_000, max_bytes=100)
+
+        self.assertEqual(packed, [first])
+        self.assertEqual(omitted, ["second.pdf"])
+
+    def test_iter_message_streams_parseable_mime(self):
+        with tempfile.TemporaryDirectory() as directory:
+            attachment = self._write(directory, "report.pdf", os.urandom(5000))
+            message = MIMEMultipart()
+            message["From"] = "sender@example.com"
+            message["To"] = "user@example.com"
+            message["Subject"] = "Results"
+
+            blocks = list(iter_message(message, "Hello", [attachment], chunk_size=57 * 10))
+            with open(attachment, "rb") as file:
+                expected = file.read()
+
+        raw = b"".join(blocks)
+        self.assertTrue(all(block.endswith(b"\r\n") for block in blocks))
+        self.assertNotIn(b"\n", raw.replace(b"\r\n", b""))
+
+        parsed = email.message_from_bytes(raw, policy=default)
+        self.assertEqual(parsed["Subject"], "Results")
+        self.assertEqual(next(parsed.iter_parts()).get_content(), "Hello")
+        attachments = list(parsed.iter_attachments())
+        self.assertEqual(attachments[0].get_filename(), "report.pdf")
+        self.assertEqual(attachments[0].get_payload(decode=True), expected)
+
+    def test_stream_sendmail_dot_stuffs_and_terminates_data(self):
+        server = Mock()
+        server.mail.return_value = (250, b"ok")
+        server.rcpt.return_value = (250, b"ok")
+        server.getreply.side_effect = [(354, b"go ahead"), (250, b"queued")]
+
+        refused = stream_sendmail(server, "a@example.com", "b@example.com", [b"Subject: x\r\n\r\n", b".hidden\r\nline\r\n"])
+
+        self.assertEqual(refused, {})
+        server.putcmd.assert_called_once_with("data")
+        sent = b"".join(call.args[0] for call in server.send.call_args_list)
+        self.assertEqual(sent, b"Subject: x\r\n\r\n..hidden\r\nline\r\n.\r\n")
+
+    def test_send_email_reports_missing_attachment_without_connecting(self):
+        with patch("helper_services.mail_helper.get_transport") as transport_mock:
+            result = send_email("user@example.com", "Subject", "Body", attachments=["/missing/report.pdf"])
+
+        transport_mock.assert_not_called()
+        self.assertTrue(result["status"].startswith("Failed to attach files"))
+
+    def test_send_email_notes_omitted_attachments_in_body(self):
+        with tempfile.TemporaryDirectory() as directory:
+            attachment = self._write(directory, "big.xlsx", b"z" * 500)
+            transport = FileDropTransport(os.path.join(directory, "outbox"))
+
+            with patch("helper_services.mail_helper.get_transport", return_value=transport), patch(
+                "helper_services.mail_helper.tempfile.gettempdir", return_value=directory
+            ):
+                result = send_email("user@example.com", "Subject", "Body", attachments=[attachment], max_attachment_bytes=10)
+
+            [dropped] = os.listdir(transport.directory)
+            with open(os.path.join(transport.directory, dropped), "rb") as file:
+                parsed = email.message_from_bytes(file.read(), policy=default)
+
+        self.assertEqual(result, {"status": "Email sent successfully."})
+        self.assertIn("big.xlsx", next(parsed.iter_parts()).get_content())
+        self.assertEqual(list(parsed.iter_attachments()), [])
+        self.assertEqual(transport.counters["sends"], 1)
+
+    def _start_stand_in_server(self):
+        server = StandInSMTPServer()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_smtp_transport_reuses_connection_across_sends(self):
+        server = self._start_stand_in_server()
+        transport = SMTPTransport("127.0.0.1", server.server_address[1], password="", use_tls=False)
+        self.addCleanup(transport.quit)
+
+        for subject in ("first", "second"):
+            transport.send("a@example.com", "b@example.com", lambda: [f"Subject: {subject}\r\n\r\n.dot\r\n".encode()])
+
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(transport.counters["connects"], 1)
+        self.assertEqual(transport.counters["sends"], 2)
+        self.assertIsNotNone(transport.counters["last_send_seconds"])
+        self.assertEqual(server.messages[1], b"Subject: second\r\n\r\n.dot\r\n")
+
+    def test_smtp_transport_reconnects_after_server_drops_connection(self):
+        server = self._start_stand_in_server()
+        server.drop_after_data = True
+        transport = SMTPTransport("127.0.0.1", server.server_address[1], password="", use_tls=False)
+
+        transport.send("a@example.com", "b@example.com", lambda: [b"Subject: one\r\n\r\n"])
+        transport.send("a@example.com", "b@example.com", lambda: [b"Subject: two\r\n\r\n"])
+        transport.quit()
+
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(len(server.messages), 2)
+        self.assertIsNone(transport.connection)
+
+    def test_smtp_transport_replaces_connection_that_stopped_answering(self):
+        server = self._start_stand_in_server()
+        transport = SMTPTransport("127.0.0.1", server.server_address[1], password="", use_tls=False, timeout=0.2)
+        self.addCleanup(transport.close)
+
+        transport.send("a@example.com", "b@example.com", lambda: [b"Subject: one\r\n\r\n"])
+        server.hang_on_noop = True
+        start = time.perf_counter()
+        transport.send("a@example.com", "b@example.com", lambda: [b"Subject: two\r\n\r\n"])
+
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(server.connections, 2)
+        self.assertEqual(len(server.messages), 2)
+        self.assertEqual(transport.connection.sock.gettimeout(), 0.2)
+
+    def test_create_transport_selects_backend_from_environment(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with patch.dict(os.environ, {"MAIL_TRANSPORT": "file"}), patch(
+                "helper_services.mail_helper.MAIL_DROP_DIR", directory
+            ):
+                transport = create_transport()
+            self.assertIsInstance(transport, FileDropTransport)
+            self.assertEqual(transport.directory, directory)
+
+        with patch.dict(os.environ, {"MAIL_TRANSPORT": "smtp", "SMTP_HOST": "localhost", "SMTP_PORT": "2525", "SMTP_STARTTLS": "0"}):
+            transport = create_transport()
+        self.assertIsInstance(transport, SMTPTransport)
+        self.assertEqual((transport.host, transport.port, transport.use_tls), ("localhost", 2525, False))
+        self.assertEqual(transport.timeout, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
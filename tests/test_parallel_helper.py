@@ -0,0 +1,47 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from common.parallel_helper import parallel_map
+
+
+def square_or_fail(value):
+    if value < 0:
+        raise ValueError(f"negative value {value}")
+    return value * value
+
+
+class TestParallelHelper(unittest.TestCase):
+    def test_results_keep_input_order_and_isolate_errors(self):
+        for use_processes in (True, False):
+            outcomes = parallel_map(square_or_fail, [3, -1, 2, 1], max_workers=2, use_processes=use_processes)
+
+            self.assertEqual([result for result, _ in outcomes], [9, None, 4, 1])
+            self.assertIsNone(outcomes[0][1])
+            self.assertIsInstance(outcomes[1][1], ValueError)
+
+    def test_process_pool_is_not_forked_next_to_other_threads(self):
+        release = threading.Event()
+        thread = threading.Thread(target=release.wait, name="report-delivery")
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+
+        with patch("common.parallel_helper.ProcessPoolExecutor") as pool_mock, patch("builtins.print") as print_mock:
+            outcomes = parallel_map(square_or_fail, [1, 2, -3], max_workers=4)
+
+        pool_mock.assert_not_called()
+        self.assertIn("report-delivery", print_mock.call_args.args[0])
+        self.assertEqual([result for result, _ in outcomes], [1, 4, None])
+        self.assertIsInstance(outcomes[2][1], ValueError)
+
+    def test_falls_back_to_serial_when_pool_cannot_start(self):
+        with patch("common.parallel_helper.ProcessPoolExecutor", side_effect=OSError("no /dev/shm")):
+            outcomes = parallel_map(square_or_fail, [1, 2, -3], max_workers=4)
+
+        self.assertEqual([result for result, _ in outcomes], [1, 4, None])
+        self.assertIsInstance(outcomes[2][1], ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
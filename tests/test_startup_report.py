@@ -0,0 +1,29 @@
+import unittest
+
+from common.startup_report import format_report, measure_import
+
+
+class TestStartupReport(unittest.TestCase):
+    def test_measure_import_reports_seconds_and_loaded_modules(self):
+        record = measure_import("json", heavy_modules=["json.decoder", "sqlite3"])
+
+        self.assertIsNone(record["error"])
+        self.assertGreaterEqual(record["seconds"], 0)
+        self.assertEqual(record["loaded"], ["json.decoder"])
+        self.assertIn("json.decoder", format_report([record]))
+
+    def test_measure_import_reports_errors(self):
+        record = measure_import("startup_report_missing_module")
+
+        self.assertIsNone(record["seconds"])
+        self.assertIn("ModuleNotFoundError", record["error"])
+
+    def test_handler_import_defers_heavy_modules(self):
+        record = measure_import("lambda_function")
+
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["loaded"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+import unittest
+
+from helper_services.workspace_helper import RequestWorkspace, sweep_stale_workspaces
+
+
+class TestWorkspaceHelper(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = os.path.join(temp_dir.name, "workspaces")
+        self.mplconfig_dir = os.path.join(temp_dir.name, "mplconfig")
+
+    def _workspace(self, **kwargs):
+        return RequestWorkspace(root=self.root, mplconfig_dir=self.mplconfig_dir, **kwargs)
+
+    def test_workspace_redirects_environment_and_cleans_up(self):
+        original_tempdir = tempfile.gettempdir()
+        original_home = os.environ.get("HOME")
+
+        with self._workspace() as workspace:
+            self.assertEqual(tempfile.gettempdir(), workspace.path)
+            self.assertEqual(os.environ["TMPDIR"], workspace.path)
+            self.assertEqual(os.environ["HOME"], os.path.join(workspace.path, "home"))
+            self.assertEqual(os.environ["MPLCONFIGDIR"], self.mplconfig_dir)
+            with open(os.path.join(tempfile.gettempdir(), "report.pdf"), "wb") as file:
+                file.write(b"x" * 10)
+
+        self.assertFalse(os.path.exists(workspace.path))
+        self.assertTrue(os.path.isdir(self.mplconfig_dir))
+        self.assertEqual(tempfile.gettempdir(), original_tempdir)
+        self.assertEqual(os.environ.get("HOME"), original_home)
+        self.assertEqual(workspace.telemetry["files"], 1)
+        self.assertEqual(workspace.telemetry["bytes"], 10)
+        self.assertIn("disk_free_bytes", workspace.telemetry)
+
+    def test_workspace_is_removed_when_the_request_fails(self):
+        with self.assertRaises(RuntimeError):
+            with self._workspace() as workspace:
+                raise RuntimeError("analysis failed")
+
+        self.assertFalse(os.path.exists(workspace.path))
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_stale_workspaces_are_swept_but_active_ones_are_kept(self):
+        stale = os.path.join(self.root, "request-stale")
+        os.makedirs(os.path.join(stale, "causal_analysis_fixed"))
+        with open(os.path.join(stale, "causal_analysis_fixed", "old.zip"), "wb") as file:
+            file.write(b"z" * 5)
+        old = time.time() - 3600
+        os.utime(stale, (old, old))
+
+        with self._workspace(stale_after=60) as workspace:
+            self.assertFalse(os.path.exists(stale))
+            self.assertEqual(workspace.telemetry["swept"], 1)
+            self.assertEqual(workspace.telemetry["swept_bytes"], 5)
+
+            os.utime(workspace.path, (old, old))
+            self.assertEqual(sweep_stale_workspaces(self.root, stale_after=60), (0, 0))
+            self.assertTrue(os.path.isdir(workspace.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from helper_services.download_helper import download_zip_from_url
+from helper_services.zip_cache_helper import ZipCache, cache_key
+
+
+class TestZipCacheHelper(unittest.TestCase):
+    def _write(self, path, data):
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_cache_key_prefers_profiling_link(self):
+        self.assertEqual(
+            cache_key("https://causalbench.org/api/runs/profiling/download?profiling_link=runs-1-run.zip"),
+            "runs-1-run.zip",
+        )
+        self.assertEqual(cache_key("https://example.com/a.zip#part"), "https://example.com/a.zip")
+
+    def test_store_then_fetch_copies_archive(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            source = self._write(os.path.join(temp_dir, "a.zip"), b"abc")
+            cache.store("https://example.com/a.zip", source)
+
+            target = os.path.join(temp_dir, "copy.zip")
+            self.assertTrue(cache.fetch("https://example.com/a.zip", target))
+            with open(target, "rb") as file:
+                self.assertEqual(file.read(), b"abc")
+            self.assertFalse(cache.fetch("https://example.com/b.zip", os.path.join(temp_dir, "b.zip")))
+
+            stats = cache.stats()
+            self.assertEqual((stats["hits"], stats["misses"], stats["bytes_saved"]), (1, 1, 3))
+
+    def test_writes_to_a_fetched_path_never_reach_the_cached_object(self):
+        mock_response = Mock()
+        mock_response.raise_for_status = Mock()
+        mock_response.iter_content = Mock(return_value=[b"bbb"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            cache.store("https://example.com/a.zip", self._write(os.path.join(temp_dir, "a.zip"), b"aaa"))
+            cache.store("https://example.com/c.zip", self._write(os.path.join(temp_dir, "c.zip"), b"ccc"))
+
+            download_dir = os.path.join(temp_dir, "download")
+            os.makedirs(download_dir)
+            target = os.path.join(download_dir, "run.zip")
+            self.assertTrue(cache.fetch("https://example.com/a.zip", target))
+            self.assertTrue(cache.fetch("https://example.com/c.zip", target))
+
+            with patch("helper_services.download_helper.zip_filename", return_value="run.zip"), patch(
+                "helper_services.download_helper.requests.get", return_value=mock_response
+            ):
+                download_zip_from_url("https://example.com/b.zip", download_dir)
+
+            with open(target, "rb") as file:
+                self.assertEqual(file.read(), b"bbb")
+            for url, data in (("https://example.com/a.zip", b"aaa"), ("https://example.com/c.zip", b"ccc")):
+                copy = os.path.join(temp_dir, "check.zip")
+                self.assertTrue(cache.fetch(url, copy))
+                with open(copy, "rb") as file:
+                    self.assertEqual(file.read(), data)
+            self.assertEqual(sorted(os.listdir(download_dir)), ["run.zip"])
+
+    def test_store_links_the_download_and_copies_only_when_linking_fails(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            linked = self._write(os.path.join(temp_dir, "a.zip"), b"aaa")
+            cache.store("https://example.com/a.zip", linked)
+
+            with patch("helper_services.zip_cache_helper.os.link", side_effect=OSError("cross-device link")):
+                copied = self._write(os.path.join(temp_dir, "b.zip"), b"bbb")
+                cache.store("https://example.com/b.zip", copied)
+
+            objects = {
+                name: os.stat(os.path.join(cache.objects_dir, name)).st_ino for name in os.listdir(cache.objects_dir)
+            }
+            self.assertEqual(len(objects), 2)
+            self.assertIn(os.stat(linked).st_ino, objects.values())
+            self.assertNotIn(os.stat(copied).st_ino, objects.values())
+            for url, data in (("https://example.com/a.zip", b"aaa"), ("https://example.com/b.zip", b"bbb")):
+                target = os.path.join(temp_dir, "check.zip")
+                self.assertTrue(cache.fetch(url, target))
+                with open(target, "rb") as file:
+                    self.assertEqual(file.read(), data)
+
+    def test_identical_content_is_stored_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            source = self._write(os.path.join(temp_dir, "a.zip"), b"same")
+            cache.store("https://example.com/a.zip", source)
+            cache.store("https://mirror.example.com/a.zip", source)
+
+            self.assertEqual(len(os.listdir(cache.objects_dir)), 1)
+            self.assertEqual(cache.stats()["stored_bytes"], 4)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=10)
+            cache.store("https://example.com/a.zip", self._write(os.path.join(temp_dir, "a.zip"), b"aaaa"))
+            cache.store("https://example.com/b.zip", self._write(os.path.join(temp_dir, "b.zip"), b"bbbb"))
+            self.assertTrue(cache.fetch("https://example.com/a.zip", os.path.join(temp_dir, "a-copy.zip")))
+            cache.store("https://example.com/c.zip", self._write(os.path.join(temp_dir, "c.zip"), b"cccc"))
+
+            self.assertTrue(cache.fetch("https://example.com/a.zip", os.path.join(temp_dir, "a-again.zip")))
+            self.assertFalse(cache.fetch("https://example.com/b.zip", os.path.join(temp_dir, "b-copy.zip")))
+            self.assertEqual(cache.stats()["evictions"], 1)
+            self.assertLessEqual(cache.stats()["stored_bytes"], 10)
+
+    def test_corrupted_entry_is_reported_as_miss(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ZipCache(os.path.join(temp_dir, "cache"), max_bytes=1024)
+            cache.store("https://example.com/a.zip", self._write(os.path.join(temp_dir, "a.zip"), b"abc"))
+            object_path = os.path.join(cache.objects_dir, os.listdir(cache.objects_dir)[0])
+            self._write(object_path, b"tampered")
+
+            self.assertFalse(cache.fetch("https://example.com/a.zip", os.path.join(temp_dir, "copy.zip")))
+            self.assertEqual(cache.stats()["entries"], 0)
+            self.assertEqual(os.listdir(cache.objects_dir), [])
+
+    def test_index_survives_new_instance(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_dir = os.path.join(temp_dir, "cache")
+            ZipCache(cache_dir, max_bytes=1024).store(
+                "https://example.com/a.zip", self._write(os.path.join(temp_dir, "a.zip"), b"abc")
+            )
+
+            cache = ZipCache(cache_dir, max_bytes=1024)
+            self.assertTrue(cache.fetch("https://example.com/a.zip", os.path.join(temp_dir, "copy.zip")))
+
+
+if __name__ == "__main__":
+    unittest.main()